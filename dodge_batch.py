@@ -0,0 +1,213 @@
+# Chạy hàng loạt ván "Dodge the Blocks" headless để cân bằng game
+# Mỗi ván là một GameManager không cửa sổ với seed riêng và một bot policy;
+# các ván được phân phối lên ProcessPoolExecutor (mặc định bằng số core) và
+# kết quả (điểm, level, nguyên nhân chết, các event đã gặp) được gộp vào một
+# file JSON tổng hợp.
+#
+#   python dodge_batch.py --runs 5000 --policy dodge --out summary.json
+#   python dodge_batch.py --runs 1000 --policy random --policy idle --max-frames 36000
+#   python dodge_batch.py --policy my_bots:make_policy      # policy tùy chỉnh
+#
+# Policy là hàm factory(seed) trả về policy(game_manager) -> danh sách phím đang nhấn.
+
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # không in banner ở mỗi process con
+
+import argparse
+import importlib
+import json
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+import dodge_game_enhanced as game
+
+# ===== BOT POLICY CÓ SẴN =====
+
+def idle_policy(seed):
+    """Đứng yên"""
+    def policy(gm):
+        return ()
+    return policy
+
+def random_policy(seed):
+    """Giữ một hướng ngẫu nhiên trong vài chục frame rồi đổi"""
+    rng = random.Random(seed)
+    state = {"keys": (), "frames_left": 0}
+
+    def policy(gm):
+        if state["frames_left"] <= 0:
+            state["keys"] = rng.choice(((), (pygame.K_LEFT,), (pygame.K_RIGHT,)))
+            state["frames_left"] = rng.randint(10, 60)
+        state["frames_left"] -= 1
+        return state["keys"]
+    return policy
+
+def dodge_policy(seed):
+    """Né khối gần nhất đang rơi xuống phía trên người chơi"""
+    lookahead = 200  # chỉ quan tâm khối trong khoảng này phía trên người chơi
+
+    def policy(gm):
+        player = gm.player
+        blocks = gm.blocks
+        if len(blocks) == 0:
+            return ()
+        x, y, size = blocks.x, blocks.y, blocks.size
+        threat = ((y + size > player.y - lookahead) & (y < player.y + player.height) &
+                  (x < player.x + player.width + 10) & (x + size > player.x - 10))
+        if not threat.any():
+            return ()
+        # Chạy về phía có nhiều khoảng trống hơn
+        threat_center = float((x[threat] + size[threat] / 2).mean())
+        go_left = threat_center > player.x + player.width / 2
+        if player.x <= 0:
+            go_left = False
+        elif player.x >= game.WIDTH - player.width:
+            go_left = True
+        # MIRROR_MODE đảo chiều điều khiển
+        if gm.event_mask & game.EV_MIRROR_MODE:
+            go_left = not go_left
+        return (pygame.K_LEFT,) if go_left else (pygame.K_RIGHT,)
+    return policy
+
+POLICIES = {
+    "idle": idle_policy,
+    "random": random_policy,
+    "dodge": dodge_policy,
+}
+
+def load_policy(name):
+    """Tên policy có sẵn hoặc đường dẫn "module:hàm" tới factory tùy chỉnh"""
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"không có policy '{name}' (dùng {', '.join(POLICIES)} hoặc module:hàm)")
+    return getattr(importlib.import_module(module_name), attr)
+
+# ===== CHẠY MỘT VÁN =====
+
+def run_session(job):
+    """Chạy một ván headless trong process con, trả về dict kết quả"""
+    policy_name, seed, max_frames, max_seconds = job
+    gm = game.create_headless_game(load_policy(policy_name)(seed), seed=seed)
+    start = time.perf_counter()
+    deadline = start + max_seconds if max_seconds else None
+    frames = 0
+    while not gm.game_over and frames < max_frames:
+        # Kiểm tra thời gian thực theo lô để không tốn chi phí mỗi frame
+        game.run_headless(gm, min(600, max_frames - frames))
+        frames = gm.clock.tick
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+    return {
+        "policy": policy_name,
+        "seed": seed,
+        "score": gm.score,
+        "level": gm.level,
+        "frames": gm.clock.tick,
+        "survival_s": gm.clock.now(),
+        "death_cause": gm.death_cause if gm.game_over else "survived",
+        "events": gm.events_triggered,
+        "active_events_at_end": list(gm.active_events),
+        "wall_s": time.perf_counter() - start,
+    }
+
+# ===== TỔNG HỢP =====
+
+def distribution(values):
+    ordered = sorted(values)
+    n = len(ordered)
+    if n == 0:
+        return {}
+    return {
+        "mean": statistics.fmean(ordered),
+        "min": ordered[0],
+        "p10": ordered[int(0.1 * (n - 1))],
+        "p50": ordered[int(0.5 * (n - 1))],
+        "p90": ordered[int(0.9 * (n - 1))],
+        "max": ordered[-1],
+    }
+
+def summarize(results):
+    """Gộp kết quả theo từng policy"""
+    by_policy = {}
+    for result in results:
+        by_policy.setdefault(result["policy"], []).append(result)
+    summary = {}
+    for policy, runs in by_policy.items():
+        deaths = Counter(r["death_cause"] for r in runs)
+        # Tổ hợp event đang active lúc chết, để biết event nào nguy hiểm nhất
+        killers = Counter("+".join(r["active_events_at_end"]) or "none"
+                          for r in runs if r["death_cause"] not in ("survived",))
+        summary[policy] = {
+            "runs": len(runs),
+            "score": distribution([r["score"] for r in runs]),
+            "level": distribution([r["level"] for r in runs]),
+            "survival_s": distribution([r["survival_s"] for r in runs]),
+            "death_cause": dict(deaths),
+            "events_at_death": dict(killers.most_common()),
+            "events_triggered": dict(Counter(e for r in runs for e in r["events"]).most_common()),
+        }
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chạy hàng loạt ván Dodge the Blocks headless")
+    parser.add_argument("--runs", type=int, default=1000, help="số ván cho mỗi policy")
+    parser.add_argument("--policy", action="append", help="policy (lặp lại để chạy nhiều policy)")
+    parser.add_argument("--seed", type=int, default=0, help="seed của ván đầu tiên (các ván sau +1)")
+    parser.add_argument("--max-frames", type=int, default=60 * 60 * 10,
+                        help="giới hạn số frame mỗi ván (mặc định 10 phút game)")
+    parser.add_argument("--max-seconds", type=float, default=0,
+                        help="giới hạn thời gian thực mỗi ván (0 = không giới hạn)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="số process (mặc định: số core)")
+    parser.add_argument("--out", default="batch_summary.json", help="file JSON tổng hợp")
+    parser.add_argument("--include-runs", action="store_true",
+                        help="ghi cả kết quả từng ván vào file tổng hợp")
+    args = parser.parse_args(argv)
+
+    policies = args.policy or ["dodge"]
+    for name in policies:
+        load_policy(name)  # báo lỗi sớm nếu sai tên
+    jobs = [(name, args.seed + i, args.max_frames, args.max_seconds)
+            for name in policies for i in range(args.runs)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Gửi theo lô để chi phí IPC không đáng kể so với thời gian chạy ván
+        chunksize = max(1, len(jobs) // (args.workers * 8))
+        results = list(pool.map(run_session, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    total_frames = sum(r["frames"] for r in results)
+    report = {
+        "config": {
+            "runs_per_policy": args.runs,
+            "policies": policies,
+            "first_seed": args.seed,
+            "max_frames": args.max_frames,
+            "max_seconds": args.max_seconds,
+            "workers": args.workers,
+        },
+        "elapsed_s": elapsed,
+        "frames_per_s": total_frames / elapsed if elapsed > 0 else 0,
+        "policies": summarize(results),
+    }
+    if args.include_runs:
+        report["runs"] = results
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{len(results)} ván, {total_frames} frame trong {elapsed:.1f}s "
+          f"({report['frames_per_s']:.0f} frame/s, {args.workers} process) -> {args.out}")
+    for name, stats in report["policies"].items():
+        print(f"  {name:<10} score p50={stats['score']['p50']} p90={stats['score']['p90']} "
+              f"survival p50={stats['survival_s']['p50']:.1f}s deaths={stats['death_cause']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# Benchmark thời gian frame cho "Dodge the Blocks - Enhanced Edition"
+# Chạy GameManager.update() và GameManager.draw() không cần cửa sổ (SDL dummy,
+# vẽ lên Surface ẩn) với nhiều kịch bản: số lượng khối, từng event đặc biệt,
+# particle, mưa power-up và chế độ stress trên sân lớn. In p50/p95/p99 và throughput cho từng kịch bản,
+# có thể lưu baseline và so sánh lần chạy sau để phát hiện regression.
+#
+#   python dodge_bench.py                          # chạy tất cả
+#   python dodge_bench.py -k blocks --frames 500   # lọc theo tên
+#   python dodge_bench.py --save-baseline bench_baseline.json
+#   python dodge_bench.py --compare bench_baseline.json
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+
+import pygame
+
+import dodge_game_enhanced as game
+
+BLOCK_COUNTS = (10, 100, 1000, 10000)
+EVENT_SCENARIO_BLOCKS = 200
+STRESS_ARENAS = ((400, 600), (1920, 1080), (3840, 2160))
+STRESS_PREFILL_FRAMES = 600
+
+# ===== CHUẨN BỊ KỊCH BẢN =====
+
+def new_game(seed=1):
+    """GameManager bất tử (shield vô hạn) và không tự kích hoạt event"""
+    game.set_arena(*game.DEFAULT_ARENA)
+    gm = game.create_headless_game(seed=seed)
+    gm.next_event_time = float("inf")
+    keep_alive(gm)
+    return gm
+
+def keep_alive(gm):
+    gm.player.shield_active = True
+    gm.player.shield_timer = float("inf")
+    gm.next_event_time = float("inf")
+
+def fill_blocks(gm, target):
+    """Bổ sung khối cho đủ target, rải đều theo chiều cao màn hình"""
+    missing = target - len(gm.blocks)
+    for i in range(missing):
+        x = gm.rng.randint(0, game.WIDTH - gm.block_size)
+        y = -gm.block_size + (i * 37) % (game.HEIGHT + gm.block_size)
+        gm.blocks.add(x, y, gm.block_size, gm.block_speed, gm.clock.tick)
+
+def fill_powerups(gm, target):
+    while len(gm.powerups) < target:
+        i = len(gm.powerups)
+        powerup = gm.powerup_pool.acquire(gm.rng.randint(0, game.WIDTH - game.POWERUP_SIZE),
+                                          -game.POWERUP_SIZE + (i * 23) % game.HEIGHT,
+                                          gm.rng.choice(["shield", "speed", "score"]))
+        gm.powerups.append(powerup)
+    # Giữ thứ tự y giảm dần như khi spawn bình thường
+    gm.powerups.sort(key=lambda p: -p.y)
+
+def blocks_scenario(count):
+    def setup():
+        gm = new_game()
+        fill_blocks(gm, count)
+        return gm
+
+    def refill(gm):
+        keep_alive(gm)
+        fill_blocks(gm, count)
+    return setup, refill
+
+def event_scenario(name):
+    def setup():
+        gm = new_game()
+        fill_blocks(gm, EVENT_SCENARIO_BLOCKS)
+        gm.trigger_event(name)
+        return gm
+
+    def refill(gm):
+        keep_alive(gm)
+        # Giữ event luôn active trong suốt kịch bản
+        gm.event_end_times[name] = float("inf")
+        fill_blocks(gm, EVENT_SCENARIO_BLOCKS)
+    return setup, refill
+
+def particle_scenario(bursts_per_frame):
+    def setup():
+        gm = new_game()
+        fill_blocks(gm, 100)
+        return gm
+
+    def refill(gm):
+        keep_alive(gm)
+        fill_blocks(gm, 100)
+        for i in range(bursts_per_frame):
+            gm.particles.emit(50 + i * 30 % 300, 300, game.CYAN, 8, gm.rng)
+    return setup, refill
+
+def powerup_scenario(count):
+    def setup():
+        gm = new_game()
+        fill_blocks(gm, 100)
+        fill_powerups(gm, count)
+        return gm
+
+    def refill(gm):
+        keep_alive(gm)
+        fill_blocks(gm, 100)
+        fill_powerups(gm, count)
+    return setup, refill
+
+def stress_scenario(arena):
+    """Luật stress (mưa khối, bất tử) trên sân arena, đã chạy tới trạng thái ổn định"""
+    def setup():
+        game.set_arena(*arena)
+        gm = game.create_headless_game(seed=1, rules=game.STRESS_RULES)
+        game.run_headless(gm, STRESS_PREFILL_FRAMES)
+        return gm
+
+    def refill(gm):
+        pass
+    return setup, refill
+
+def build_scenarios():
+    """Danh sách (tên, setup, refill) của mọi kịch bản"""
+    scenarios = []
+    for count in BLOCK_COUNTS:
+        scenarios.append((f"blocks-{count}",) + blocks_scenario(count))
+    for name in game.ENHANCED_EVENTS.names:
+        scenarios.append((f"event-{name}",) + event_scenario(name))
+    scenarios.append(("particles-burst-8",) + particle_scenario(8))
+    scenarios.append(("particles-burst-32",) + particle_scenario(32))
+    scenarios.append(("powerups-storm-50",) + powerup_scenario(50))
+    scenarios.append(("powerups-storm-500",) + powerup_scenario(500))
+    for width, height in STRESS_ARENAS:
+        scenarios.append((f"stress-{width}x{height}",) + stress_scenario((width, height)))
+    return scenarios
+
+# ===== ĐO THỜI GIAN =====
+
+def percentile(sorted_values, p):
+    """Percentile theo nearest-rank trên danh sách đã sắp xếp"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+    }
+
+def run_scenario(setup, refill, frames, warmup):
+    """Chạy một kịch bản, trả về thống kê thời gian (ms) của update, draw và cả frame"""
+    gm = setup()
+    # Tạo sau setup: kịch bản stress đổi kích thước sân
+    surface = pygame.Surface((game.WIDTH, game.HEIGHT))
+    update_ms, draw_ms, frame_ms = [], [], []
+    perf = time.perf_counter
+    for i in range(warmup + frames):
+        refill(gm)
+        t0 = perf()
+        gm.update()
+        t1 = perf()
+        gm.draw(surface)
+        t2 = perf()
+        if i >= warmup:
+            update_ms.append((t1 - t0) * 1000)
+            draw_ms.append((t2 - t1) * 1000)
+            frame_ms.append((t2 - t0) * 1000)
+    total_s = sum(frame_ms) / 1000
+    return {
+        "update": summarize(update_ms),
+        "draw": summarize(draw_ms),
+        "frame": summarize(frame_ms),
+        "fps": frames / total_s if total_s > 0 else float("inf"),
+    }
+
+# ===== BASELINE =====
+
+def compare(results, baseline, threshold):
+    """Trả về danh sách kịch bản có p95 của frame chậm hơn baseline quá threshold lần"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        old, new = base["frame"]["p95"], result["frame"]["p95"]
+        if old > 0 and new > old * threshold:
+            regressions.append((name, old, new))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark update/draw của Dodge the Blocks")
+    parser.add_argument("-k", dest="pattern", default="", help="chỉ chạy kịch bản có tên chứa chuỗi này")
+    parser.add_argument("--frames", type=int, default=300, help="số frame đo mỗi kịch bản")
+    parser.add_argument("--warmup", type=int, default=30, help="số frame chạy trước khi đo")
+    parser.add_argument("--save-baseline", metavar="FILE", help="lưu kết quả làm baseline (JSON)")
+    parser.add_argument("--compare", metavar="FILE", help="so sánh với baseline đã lưu")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="báo regression khi p95 frame > baseline * threshold")
+    args = parser.parse_args(argv)
+
+    pygame.display.init()
+
+    results = {}
+    print(f"{'scenario':<28}{'update p50/p95/p99 (ms)':>26}{'draw p50/p95/p99 (ms)':>26}{'fps':>10}")
+    for name, setup, refill in build_scenarios():
+        if args.pattern not in name:
+            continue
+        result = run_scenario(setup, refill, args.frames, args.warmup)
+        results[name] = result
+        u, d = result["update"], result["draw"]
+        print(f"{name:<28}"
+              f"{u['p50']:>8.3f}/{u['p95']:.3f}/{u['p99']:.3f}".rjust(26) +
+              f"{d['p50']:>8.3f}/{d['p95']:.3f}/{d['p99']:.3f}".rjust(26) +
+              f"{result['fps']:>10.0f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Đã lưu baseline vào {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: p95 frame {old:.3f} ms -> {new:.3f} ms")
+        if regressions:
+            return 1
+        print("Không có regression so với baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
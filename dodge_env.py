@@ -0,0 +1,450 @@
+# Môi trường kiểu Gym để huấn luyện bot cho "Dodge the Blocks - Enhanced Edition"
+#
+#   DodgeEnv:       một ván, chạy đúng GameManager (luật chính xác, có seed)
+#   BatchDodgeEnv:  N ván chạy lockstep; trạng thái người chơi, khối và power-up
+#                   của cả N ván nằm trong các mảng NumPy dùng chung, nên mỗi
+#                   bước chỉ là một lời gọi Python cho cả batch
+#
+# Action: 0 = đứng yên, 1 = sang trái, 2 = sang phải.
+# Reward: số điểm tăng thêm trong bước đó. done = True khi người chơi chết.
+# Observation (float32, OBS_SIZE phần tử):
+#   [x người chơi, shield, speed boost, mirror, gravity flip, magnet,
+#    rồi NEAREST_BLOCKS khối thấp nhất: (dx, dy, kích thước)]  — đã chuẩn hóa theo màn hình
+#
+# Kích thước sân (game.set_arena) được đọc lúc tạo/reset môi trường.
+#
+#   python dodge_env.py     # so khớp LASER_BEAM giữa DodgeEnv và BatchDodgeEnv
+
+import math
+import sys
+
+import numpy as np
+
+import dodge_game_enhanced as game
+
+ACTION_NONE = 0
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_MASKS = (0, game.INPUT_LEFT, game.INPUT_RIGHT)
+
+NEAREST_BLOCKS = 8
+OBS_SIZE = 6 + NEAREST_BLOCKS * 3
+
+TICKS_PER_MS = game.FPS / 1000
+
+def player_y(height):
+    """Tọa độ y (cố định) của người chơi trên sân cao height"""
+    return height - game.PLAYER_SIZE - 10
+
+def block_features(player_x, bx, by, bsize, alive, width, height):
+    """Đặc trưng của NEAREST_BLOCKS khối thấp nhất cho mỗi ván, shape (N, NEAREST_BLOCKS * 3)"""
+    n = bx.shape[0]
+    key = np.where(alive, by, -np.inf)
+    k = min(NEAREST_BLOCKS, bx.shape[1])
+    idx = np.argsort(-key, axis=1)[:, :k]
+    rows = np.arange(n)[:, None]
+    valid = alive[rows, idx]
+    center = player_x[:, None] + game.PLAYER_SIZE / 2
+    features = np.zeros((n, NEAREST_BLOCKS, 3), dtype=np.float32)
+    features[:, :k, 0] = np.where(valid, (bx[rows, idx] + bsize[rows, idx] / 2 - center) / width, 0)
+    features[:, :k, 1] = np.where(valid, (player_y(height) - by[rows, idx]) / height, 0)
+    features[:, :k, 2] = np.where(valid, bsize[rows, idx] / width, 0)
+    return features.reshape(n, NEAREST_BLOCKS * 3)
+
+# ===== MỘT VÁN (GameManager) =====
+
+class DodgeEnv:
+    """Môi trường một ván, chạy đúng luật và RNG của GameManager"""
+    def __init__(self):
+        self.game = None
+        self.width, self.height = game.WIDTH, game.HEIGHT
+
+    def reset(self, seed=None):
+        self.width, self.height = game.WIDTH, game.HEIGHT
+        self.game = game.GameManager(seed=seed)
+        return self._observation()
+
+    def step(self, action):
+        gm = self.game
+        score = gm.score
+        gm.update_from_mask(ACTION_MASKS[action])
+        reward = float(gm.score - score)
+        info = {"score": gm.score, "level": gm.level, "death_cause": gm.death_cause}
+        return self._observation(), reward, gm.game_over, info
+
+    def _observation(self):
+        gm = self.game
+        blocks = gm.blocks
+        obs = np.zeros(OBS_SIZE, dtype=np.float32)
+        obs[0] = gm.player.x / self.width
+        obs[1] = gm.player.shield_active
+        obs[2] = gm.player.speed_boost_active
+        obs[3] = bool(gm.event_mask & game.EV_MIRROR_MODE)
+        obs[4] = bool(gm.event_mask & game.EV_GRAVITY_FLIP)
+        obs[5] = bool(gm.event_mask & game.EV_MAGNET_PULL)
+        n = len(blocks)
+        if n:
+            obs[6:] = block_features(np.array([gm.player.x], dtype=float),
+                                     blocks.x[None, :], blocks.y[None, :], blocks.size[None, :],
+                                     np.ones((1, n), dtype=bool), self.width, self.height)[0]
+        return obs
+
+# ===== N VÁN LOCKSTEP =====
+
+# Chỉ số event trong batch env theo đúng thứ tự của ENHANCED_EVENTS
+EVENT_NAMES = tuple(game.ENHANCED_EVENTS.names)
+_EV = {name: i for i, name in enumerate(EVENT_NAMES)}
+NO_EVENT = -1
+
+class BatchDodgeEnv:
+    """N ván chạy song song, toàn bộ trạng thái nằm trong mảng NumPy shape (N, ...)
+
+    Luật giống GameManager (spawn theo level, 18 event, power-up, shield, boost,
+    điểm thưởng khi qua event) nhưng dùng chung một luồng ngẫu nhiên cho cả batch,
+    nên từng ván không trùng khớp bit-by-bit với GameManager cùng seed. Các event
+    chỉ thay đổi hình ảnh (GHOST, COLOR_CHANGE, INVISIBLE, EARTHQUAKE) không ảnh
+    hưởng mô phỏng. Ván nào chết sẽ tự reset ngay trong step(); điểm cuối nằm ở
+    info["final_score"].
+    """
+    def __init__(self, num_envs, max_blocks=128, max_powerups=16):
+        self.num_envs = num_envs
+        self.max_blocks = max_blocks
+        self.max_powerups = max_powerups
+        n, b, p = num_envs, max_blocks, max_powerups
+        self.rng = np.random.default_rng()
+        self._read_arena()
+
+        # Người chơi và thông số ván
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.player_x = np.zeros(n)
+        self.player_speed = np.zeros(n)
+        self.shield_until = np.zeros(n)
+        self.boost_until = np.zeros(n)
+        self.shield = np.zeros(n, dtype=bool)
+        self.boost = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.level = np.zeros(n, dtype=np.int64)
+        self.block_speed = np.zeros(n)
+        self.block_size = np.zeros(n)
+        self.multiplier = np.zeros(n, dtype=np.int64)
+        self.next_block_spawn = np.zeros(n)
+        self.next_powerup_spawn = np.zeros(n)
+        self.next_event = np.zeros(n)
+        self.event = np.zeros(n, dtype=np.int64)
+        self.event_end = np.zeros(n)
+        self.rain_blocks = np.zeros(n, dtype=np.int64)   # BLOCK_RAIN còn lại
+        self.rain_shields = np.zeros(n, dtype=np.int64)  # SHIELD_RAIN còn lại
+        self.rain_start = np.zeros(n)
+
+        # Khối rơi
+        self.bx = np.zeros((n, b))
+        self.by = np.zeros((n, b))
+        self.bsize = np.zeros((n, b))
+        self.bspeed = np.zeros((n, b))
+        self.bborn = np.zeros((n, b))
+        self.balive = np.zeros((n, b), dtype=bool)
+
+        # Power-up (loại: 0 shield, 1 speed, 2 score)
+        self.px = np.zeros((n, p))
+        self.py = np.zeros((n, p))
+        self.ptype = np.zeros((n, p), dtype=np.int64)
+        self.palive = np.zeros((n, p), dtype=bool)
+
+    # ----- reset -----
+
+    def _read_arena(self):
+        self.width, self.height = game.WIDTH, game.HEIGHT
+        self.player_y = player_y(self.height)
+        self.laser_y = self.height * 0.7  # giống _laser_beam_start của GameManager
+
+    def reset(self, seed=None):
+        """Reset toàn bộ N ván, trả về observation shape (N, OBS_SIZE)"""
+        self.rng = np.random.default_rng(seed)
+        self._read_arena()
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._observation()
+
+    def _reset_envs(self, mask):
+        if not mask.any():
+            return
+        count = int(mask.sum())
+        self.tick[mask] = 0
+        self.player_x[mask] = self.width // 2 - game.PLAYER_SIZE // 2
+        self.player_speed[mask] = game.INIT_PLAYER_SPEED
+        self.shield[mask] = False
+        self.boost[mask] = False
+        self.score[mask] = 0
+        self.level[mask] = 1
+        self.block_speed[mask] = game.INIT_BLOCK_SPEED
+        self.block_size[mask] = game.BLOCK_SIZE
+        self.multiplier[mask] = 1
+        self.next_block_spawn[mask] = 1
+        self.next_powerup_spawn[mask] = 1
+        self.next_event[mask] = self.rng.integers(8, 16, count) * game.FPS
+        self.event[mask] = NO_EVENT
+        self.rain_blocks[mask] = 0
+        self.rain_shields[mask] = 0
+        self.balive[mask] = False
+        self.palive[mask] = False
+
+    # ----- spawn -----
+
+    def _spawn_blocks(self, envs):
+        """Thêm một khối cho mỗi ván trong envs (bỏ qua nếu ván đã đầy)"""
+        if envs.size == 0:
+            return
+        slot = np.argmin(self.balive[envs], axis=1)
+        free = ~self.balive[envs, slot]
+        envs, slot = envs[free], slot[free]
+        size = self.block_size[envs]
+        self.bx[envs, slot] = self.rng.integers(0, self.width - size + 1)
+        self.by[envs, slot] = -size
+        self.bsize[envs, slot] = size
+        self.bspeed[envs, slot] = self.block_speed[envs]
+        self.bborn[envs, slot] = self.tick[envs]
+        self.balive[envs, slot] = True
+
+    def _spawn_powerups(self, envs, kinds):
+        if envs.size == 0:
+            return
+        slot = np.argmin(self.palive[envs], axis=1)
+        free = ~self.palive[envs, slot]
+        envs, slot, kinds = envs[free], slot[free], kinds[free]
+        self.px[envs, slot] = self.rng.integers(0, self.width - game.POWERUP_SIZE + 1, envs.size)
+        self.py[envs, slot] = -game.POWERUP_SIZE
+        self.ptype[envs, slot] = kinds
+        self.palive[envs, slot] = True
+
+    def _powerup_spawn_delay(self, count):
+        """Như GameManager.powerup_spawn_delay() cho count ván: tung ngưỡng của mọi frame một lượt"""
+        # Sau 15 giây ngưỡng 8000 + randint(0, 7000) ms chắc chắn đã bị vượt
+        frames = np.arange(math.floor(8 * game.FPS) + 1, math.floor(15 * game.FPS) + 2)
+        thresholds = 8000 + self.rng.integers(0, 7001, (count, frames.size))
+        passed = frames * (1000 / game.FPS) > thresholds
+        return frames[np.argmax(passed, axis=1)]
+
+    # ----- event -----
+
+    def _start_events(self, envs):
+        n = envs.size
+        if n == 0:
+            return
+        event = self.rng.integers(0, len(EVENT_NAMES), n)
+        tick = self.tick[envs]
+        self.event[envs] = event
+        self.event_end[envs] = tick + 6 * game.FPS
+        self.next_event[envs] = tick + self.rng.integers(10, 21, n) * game.FPS
+
+        def pick(name):
+            return envs[event == _EV[name]]
+        self.block_size[pick("BIG_BLOCKS")] = int(game.BLOCK_SIZE * 1.8)
+        self.block_size[pick("TINY_BLOCKS")] = int(game.BLOCK_SIZE * 0.6)
+        fast = pick("FAST_BLOCKS")
+        self.block_speed[fast] += 3
+        self.multiplier[fast] = 3
+        slow = pick("SLOW_MOTION")
+        self.block_speed[slow] = np.maximum(1, (self.block_speed[slow] * 0.3).astype(np.int64))
+        self.player_speed[slow] = int(game.INIT_PLAYER_SPEED * 0.5)
+        self.multiplier[pick("DOUBLE_SCORE")] = 4
+        self.block_speed[pick("FREEZE_BLOCKS")] = 0
+        rain = pick("BLOCK_RAIN")
+        self.rain_blocks[rain] = 12
+        self.rain_start[rain] = self.tick[rain]
+        shields = pick("SHIELD_RAIN")
+        self.rain_shields[shields] = 3
+        self.rain_start[shields] = self.tick[shields]
+
+    def _end_events(self, envs):
+        if envs.size == 0:
+            return
+        event = self.event[envs]
+
+        def pick(*names):
+            return envs[np.isin(event, [_EV[name] for name in names])]
+        self.block_size[pick("BIG_BLOCKS", "TINY_BLOCKS")] = game.BLOCK_SIZE
+        reset_speed = pick("FAST_BLOCKS", "SLOW_MOTION", "FREEZE_BLOCKS")
+        self.block_speed[reset_speed] = game.INIT_BLOCK_SPEED + self.level[reset_speed]
+        self.multiplier[pick("FAST_BLOCKS", "DOUBLE_SCORE")] = 1
+        self.player_speed[pick("SLOW_MOTION")] = game.INIT_PLAYER_SPEED
+        self.event[envs] = NO_EVENT
+        self.score[envs] += 15
+
+    def _active(self, name):
+        return self.event == _EV[name]
+
+    # ----- step -----
+
+    def step(self, actions):
+        """Tiến mọi ván một tick với actions shape (N,)
+
+        Trả về (observation, reward, done, info) với reward/done shape (N,).
+        """
+        actions = np.asarray(actions)
+        n = self.num_envs
+        envs = np.arange(n)
+        width, height, py = self.width, self.height, self.player_y
+        score_before = self.score.copy()
+        self.tick += 1
+        tick = self.tick
+
+        # Người chơi (MIRROR_MODE đảo chiều)
+        direction = (actions == ACTION_RIGHT).astype(float) - (actions == ACTION_LEFT)
+        direction[self._active("MIRROR_MODE")] *= -1
+        self.player_x += direction * self.player_speed
+        np.clip(self.player_x, 0, width - game.PLAYER_SIZE, out=self.player_x)
+        self.shield &= tick <= self.shield_until
+        boost_over = self.boost & (tick > self.boost_until)
+        self.boost[boost_over] = False
+        self.player_speed[boost_over] = game.INIT_PLAYER_SPEED
+
+        # Kết thúc event hết giờ
+        self._end_events(envs[(self.event != NO_EVENT) & (tick > self.event_end)])
+
+        # Mưa khối / mưa shield đã lên lịch
+        rain_due = (self.rain_blocks > 0) & (tick - self.rain_start >= (12 - self.rain_blocks) * 0.08 * game.FPS)
+        self._spawn_blocks(envs[rain_due])
+        self.rain_blocks[rain_due] -= 1
+        shield_due = (self.rain_shields > 0) & (tick - self.rain_start >= (3 - self.rain_shields) * 0.5 * game.FPS)
+        shield_envs = envs[shield_due]
+        self._spawn_powerups(shield_envs, np.zeros(shield_envs.size, dtype=np.int64))
+        self.rain_shields[shield_due] -= 1
+
+        # Spawn khối và power-up theo thời gian (lần kế tiếp hẹn ngay khi spawn,
+        # giống TimerQueue của GameManager)
+        spawn = tick >= self.next_block_spawn
+        self._spawn_blocks(envs[spawn])
+        interval = np.maximum(game.BLOCK_SPAWN_INTERVAL - self.level[spawn] * 50, 300) * TICKS_PER_MS
+        self.next_block_spawn[spawn] = tick[spawn] + np.floor(interval) + 1
+        spawn = tick >= self.next_powerup_spawn
+        spawn_envs = envs[spawn]
+        self._spawn_powerups(spawn_envs, self.rng.integers(0, 3, spawn_envs.size))
+        self.next_powerup_spawn[spawn] = tick[spawn] + self._powerup_spawn_delay(spawn_envs.size)
+
+        # Kích hoạt event
+        self._start_events(envs[(self.score >= 50) & (tick > self.next_event) & (self.event == NO_EVENT)])
+
+        # Di chuyển khối
+        alive = self.balive
+        bx, by, bsize = self.bx, self.by, self.bsize
+        gravity = self._active("GRAVITY_FLIP")
+        teleport = self._active("TELEPORT_BLOCKS")[:, None] & alive & (
+            self.rng.random(alive.shape) < 0.005)
+        if teleport.any():
+            bx[teleport] = self.rng.integers(0, width - bsize[teleport] + 1)
+        by += np.where(gravity[:, None], -np.abs(self.bspeed), self.bspeed)
+        spiral = self._active("SPIRAL_BLOCKS")
+        if spiral.any():
+            bx[spiral] += np.sin((tick[spiral, None] - self.bborn[spiral]) * (3.0 / game.FPS)) * 2
+        magnet = self._active("MAGNET_PULL")
+        if magnet.any():
+            center = self.player_x[magnet, None] + game.PLAYER_SIZE // 2
+            bx[magnet] += (center - (bx[magnet] + bsize[magnet] // 2)) * 0.05
+        np.clip(bx, 0, width - bsize, out=bx)
+
+        # Va chạm với khối (cùng quy tắc với pygame.Rect.colliderect)
+        px = np.trunc(self.player_x)[:, None]
+        tx, ty = np.trunc(bx), np.trunc(by)
+        hit = alive & (tx < px + game.PLAYER_SIZE) & (px < tx + bsize) & \
+            (ty < py + game.PLAYER_SIZE) & (py < ty + bsize)
+        # Shield nhặt trong bước này chỉ có tác dụng từ bước sau (kể cả với laser)
+        exposed = ~self.shield
+        dead = hit.any(axis=1) & exposed
+
+        # Khối ra khỏi màn hình được tính điểm
+        gone = alive & np.where(gravity[:, None], by < -bsize, by > height)
+        alive &= ~gone
+        self.score += gone.sum(axis=1) * self.multiplier * ~dead
+
+        # Power-up
+        palive = self.palive
+        self.py += 2
+        got = palive & (self.px < px + game.PLAYER_SIZE) & (px < self.px + game.POWERUP_SIZE) & \
+            (self.py < py + game.PLAYER_SIZE) & (py < self.py + game.POWERUP_SIZE) & \
+            ~dead[:, None]
+        if got.any():
+            for kind in range(3):
+                got_kind = (got & (self.ptype == kind)).sum(axis=1)
+                has = got_kind > 0
+                if kind == 0:
+                    self.shield[has] = True
+                    self.shield_until[has] = tick[has] + 5 * game.FPS
+                elif kind == 1:
+                    self.boost[has] = True
+                    self.boost_until[has] = tick[has] + 5 * game.FPS
+                    self.player_speed[has] = int(game.INIT_PLAYER_SPEED * 1.5)
+                else:
+                    self.score += 50 * got_kind
+        palive &= ~got & (self.py <= height)
+
+        # Laser beam (dày 10px quanh laser_y): chạm dải của người chơi là chết
+        if self.laser_y - 5 < py + game.PLAYER_SIZE and py < self.laser_y + 5:
+            dead |= self._active("LASER_BEAM") & exposed
+
+        # Level
+        new_level = self.score // 100 + 1
+        up = (new_level > self.level) & ~dead
+        self.level[up] = new_level[up]
+        self.block_speed[up] = game.INIT_BLOCK_SPEED + self.level[up]
+
+        reward = (self.score - score_before).astype(np.float32)
+        info = {"final_score": np.where(dead, self.score, -1), "level": self.level.copy()}
+        self._reset_envs(dead)
+        return self._observation(), reward, dead, info
+
+    def _observation(self):
+        obs = np.zeros((self.num_envs, OBS_SIZE), dtype=np.float32)
+        obs[:, 0] = self.player_x / self.width
+        obs[:, 1] = self.shield
+        obs[:, 2] = self.boost
+        obs[:, 3] = self._active("MIRROR_MODE")
+        obs[:, 4] = self._active("GRAVITY_FLIP")
+        obs[:, 5] = self._active("MAGNET_PULL")
+        obs[:, 6:] = block_features(self.player_x, self.bx, self.by, self.bsize, self.balive,
+                                    self.width, self.height)
+        return obs
+
+# ===== SO KHỚP VỚI GAMEMANAGER =====
+
+def check_laser_parity(arenas=((400, 600), (400, 200)), steps=20):
+    """Bật LASER_BEAM ở cả DodgeEnv và BatchDodgeEnv, so bước người chơi chết
+
+    Sân 400x200 đặt laser (70% chiều cao) đè lên dải của người chơi, sân mặc
+    định thì không. Trả về danh sách (sân, shield, bước chết DodgeEnv, bước
+    chết BatchDodgeEnv) của các trường hợp lệch nhau.
+    """
+    mismatches = []
+    try:
+        for arena in arenas:
+            game.set_arena(*arena)
+            for shield in (False, True):
+                single = DodgeEnv()
+                single.reset(seed=1)
+                gm = single.game
+                gm.trigger_event("LASER_BEAM")
+                gm.player.shield_active = shield
+                gm.player.shield_timer = float("inf")
+                batch = BatchDodgeEnv(1)
+                batch.reset(seed=1)
+                batch.event[:] = _EV["LASER_BEAM"]
+                batch.event_end[:] = 6 * game.FPS
+                batch.shield[:] = shield
+                batch.shield_until[:] = np.inf
+                single_death = batch_death = None
+                for step in range(steps):
+                    if single_death is None and single.step(ACTION_NONE)[2]:
+                        single_death = step
+                    if batch_death is None and batch.step([ACTION_NONE])[2][0]:
+                        batch_death = step
+                if single_death != batch_death:
+                    mismatches.append((arena, shield, single_death, batch_death))
+    finally:
+        game.set_arena(*game.DEFAULT_ARENA)
+    return mismatches
+
+if __name__ == "__main__":
+    mismatches = check_laser_parity()
+    for arena, shield, single, batch in mismatches:
+        print(f"LỆCH sân {arena[0]}x{arena[1]} shield={shield}: DodgeEnv chết ở bước {single}, "
+              f"BatchDodgeEnv ở bước {batch}")
+    print("OK" if not mismatches else f"{len(mismatches)} trường hợp lệch")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,40 @@
+# Font chữ dùng chung cho "Dodge the Blocks"
+# Không dùng pygame.font.SysFont: hàm này quét toàn bộ thư mục font của hệ
+# thống và là phần chậm nhất khi khởi động. Font được nạp từ một file TTF đi
+# kèm, chỉ khi lần đầu cần tới, và cache theo kích thước.
+#
+# Thứ tự chọn file font:
+#   1. biến môi trường DODGE_FONT (đường dẫn tới file .ttf/.otf)
+#   2. fonts/game.ttf cạnh file này (nếu có)
+#   3. font mặc định đi kèm pygame (freesansbold.ttf)
+
+import os
+
+import pygame
+
+FONT_ENV = "DODGE_FONT"
+BUNDLED_FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "game.ttf")
+
+_fonts = {}  # kích thước -> pygame.font.Font
+
+def font_path():
+    """Đường dẫn file font sẽ dùng (None = font mặc định của pygame)"""
+    path = os.environ.get(FONT_ENV)
+    if path:
+        return path
+    if os.path.exists(BUNDLED_FONT):
+        return BUNDLED_FONT
+    return None
+
+def get_font(size):
+    """Font theo kích thước, tạo ở lần gọi đầu tiên rồi dùng lại"""
+    font = _fonts.get(size)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[size] = pygame.font.Font(font_path(), size)
+    return font
+
+def clear_fonts():
+    """Bỏ cache (ví dụ sau khi đổi DODGE_FONT)"""
+    _fonts.clear()
@@ -2,19 +2,31 @@
 # Người chơi điều khiển khối vuông bên dưới để tránh các vật thể rơi từ trên xuống
 # Phiên bản này bao gồm nhiều sự kiện thú vị và power-ups để tăng độ hấp dẫn
 
-import os
+import time
+STARTUP_T0 = time.perf_counter()  # mốc bắt đầu để đo thời gian khởi động (--startup-report)
+
 import pygame
 import random
-import time
 import math
+import heapq
+import argparse
+from collections import OrderedDict, deque
+import numpy as np
+
+from dodge_fonts import get_font
+from dodge_profiler import FrameProfiler, NULL_PROFILER, StartupTimer
+from dodge_replay import Replay, numbered_path
+from dodge_scores import ScoreStore
+from dodge_telemetry import NULL_TELEMETRY, Telemetry, DEFAULT_DIR as TELEMETRY_DIR
 
 # ===== KHỞI TẠO PYGAME =====
-pygame.init()
-WIDTH, HEIGHT = 400, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("🚧 Dodge the Blocks - Enhanced Edition")
-clock = pygame.time.Clock()
+# Cửa sổ và font chỉ được tạo khi chạy có giao diện (xem init_display),
+# nhờ vậy có thể import module và chạy GameManager ở chế độ headless
+DEFAULT_ARENA = (400, 600)
+WIDTH, HEIGHT = DEFAULT_ARENA  # kích thước logic của sân chơi (xem set_arena)
 FPS = 60
+screen = None
+clock = None
 
 # ===== ĐỊNH NGHĨA MÀU SẮC =====
 WHITE = (255, 255, 255)
@@ -32,36 +44,583 @@ PINK = (255, 0, 128)
 PLAYER_SIZE = 50
 BLOCK_SIZE = 50
 POWERUP_SIZE = 30
+POWERUP_SPEED = 2
 INIT_BLOCK_SPEED = 4
 INIT_PLAYER_SPEED = 5
 BLOCK_SPAWN_INTERVAL = 1000  # milliseconds
 
 # ===== FONT CHỮ =====
-font_small = pygame.font.SysFont("Arial", 16)
-font_medium = pygame.font.SysFont("Arial", 24)
-font_large = pygame.font.SysFont("Arial", 36)
-
-# ===== ĐỌC/GHI ĐIỂM CAO =====
-SAVE_FILE = "highscore.txt"
-if os.path.exists(SAVE_FILE):
-    with open(SAVE_FILE, "r") as f:
-        HIGH_SCORE = int(f.read())
-else:
-    HIGH_SCORE = 0
-
-def save_high_score(score):
-    """Lưu điểm cao vào file"""
-    global HIGH_SCORE
-    if score > HIGH_SCORE:
-        HIGH_SCORE = score
-        with open(SAVE_FILE, "w") as f:
-            f.write(str(HIGH_SCORE))
+# Kích thước font; font thật được tạo ở lần vẽ chữ đầu tiên (xem dodge_fonts)
+FONT_SMALL = 16
+FONT_MEDIUM = 24
+FONT_LARGE = 36
+
+def set_arena(width, height):
+    """Đổi kích thước logic của sân chơi (gọi trước khi tạo GameManager/mở cửa sổ)
+
+    Mọi entity đọc WIDTH/HEIGHT của module lúc chạy nên chỉ cần đổi hai biến này.
+    """
+    global WIDTH, HEIGHT
+    WIDTH, HEIGHT = width, height
+
+def parse_arena(text):
+    """"1920x1080" -> (1920, 1080) (dùng làm type cho argparse)"""
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"kích thước không hợp lệ: {text} (dạng RỘNGxCAO)")
+    if width < PLAYER_SIZE * 2 or height < PLAYER_SIZE * 4 or width > 65535 or height > 65535:
+        raise argparse.ArgumentTypeError(f"kích thước ngoài giới hạn: {text}")
+    return width, height
+
+def init_display(scaled=False, title="Enhanced Edition"):
+    """Mở cửa sổ game và trả về screen
+
+    Chỉ khởi tạo subsystem display (không audio, joystick...); font được
+    khởi tạo riêng khi cần. scaled: vẽ ở độ phân giải logic WIDTH x HEIGHT và
+    để pygame (SCALED) co giãn lên cửa sổ, giữ nguyên tỉ lệ. title: tên chế
+    độ chơi (Ruleset.title) trên thanh tiêu đề.
+    """
+    global screen, clock
+    pygame.display.init()
+    flags = pygame.SCALED | pygame.RESIZABLE if scaled else 0
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), flags)
+    pygame.display.set_caption(f"🚧 Dodge the Blocks - {title}")
+    clock = pygame.time.Clock()
+    # Sprite tạo trước khi có cửa sổ chưa được convert
+    sprite_cache.clear()
+    return screen
+
+# ===== CACHE CHỮ ĐÃ RENDER =====
+
+class TextCache:
+    """Cache LRU giới hạn cho các Surface chữ đã render, khóa theo (chữ, font, màu)
+
+    HUD và menu vẽ lại cùng một nội dung mỗi frame; chữ chỉ được render lại
+    khi giá trị thay đổi. Khi vượt quá max_entries, mục ít dùng nhất bị loại.
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def render(self, font, text, color):
+        key = (text, font, color)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+    
+    def clear(self):
+        self.entries.clear()
+
+text_cache = TextCache()
+
+def render_text(font, text, color):
+    """Render chữ (antialias) thông qua cache dùng chung"""
+    return text_cache.render(font, text, color)
+
+# ===== CACHE SPRITE =====
+
+class SpriteCache:
+    """Cache các Surface vẽ sẵn cho khối, người chơi, power-up và vòng shield
+
+    Mỗi sprite được tạo một lần theo (loại, kích thước, màu, alpha) và convert
+    sang định dạng pixel của màn hình, nên khi vẽ frame chỉ còn blit, không
+    tạo Surface mới. Kích thước BIG/TINY_BLOCKS và alpha GHOST/INVISIBLE là
+    các khóa riêng.
+    """
+    def __init__(self):
+        self.entries = {}
+
+    def _finish(self, surface, alpha=255):
+        # convert() cần cửa sổ đã mở; headless thì dùng nguyên Surface
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        if alpha < 255:
+            surface.set_alpha(alpha)
+        return surface
+
+    def rect(self, width, height, color, alpha=255):
+        """Hình chữ nhật đặc"""
+        key = ("rect", width, height, color, alpha)
+        sprite = self.entries.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((width, height))
+            sprite.fill(color)
+            sprite = self.entries[key] = self._finish(sprite, alpha)
+        return sprite
+
+    def ring(self, radius, color, thickness):
+        """Vòng tròn rỗng bán kính radius, tâm tại (radius + 1, radius + 1)"""
+        key = ("ring", radius, color, thickness)
+        sprite = self.entries.get(key)
+        if sprite is None:
+            side = radius * 2 + 2
+            sprite = pygame.Surface((side, side))
+            pygame.draw.circle(sprite, color, (radius + 1, radius + 1), radius, thickness)
+            sprite = self._finish(sprite)
+            sprite.set_colorkey(BLACK)
+            self.entries[key] = sprite
+        return sprite
+
+    def labeled_rect(self, size, color, symbol, font, text_color):
+        """Ô vuông có ký hiệu ở giữa (power-up)"""
+        key = ("label", size, color, symbol, font, text_color)
+        sprite = self.entries.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((size, size))
+            sprite.fill(color)
+            text = render_text(font, symbol, text_color)
+            sprite.blit(text, text.get_rect(center=(size // 2, size // 2)))
+            sprite = self.entries[key] = self._finish(sprite)
+        return sprite
+
+    def clear(self):
+        self.entries.clear()
+
+sprite_cache = SpriteCache()
+
+# ===== ĐỒNG HỒ VÀ NGUỒN INPUT =====
+
+class SimulationClock:
+    """Đồng hồ mô phỏng chạy theo tick cố định (1 tick = 1/FPS giây)
+
+    Mọi bộ đếm thời gian trong game (shield, spawn, event...) tính bằng tick,
+    nên kết quả không phụ thuộc việc clock.tick(FPS) có giữ được 60 FPS hay không.
+    """
+    def __init__(self, fps=FPS):
+        self.fps = fps
+        self.tick = 0
+
+    def reset(self):
+        self.tick = 0
+
+    def advance(self):
+        self.tick += 1
+
+    def now(self):
+        """Thời gian game tính bằng giây"""
+        return self.tick / self.fps
+
+    def ticks(self, seconds):
+        """Đổi số giây sang số tick"""
+        return seconds * self.fps
+
+class GameRandom:
+    """Luồng số ngẫu nhiên duy nhất của một ván game, khởi tạo từ seed
+
+    Cùng seed và cùng chuỗi input luôn cho ra cùng một ván game. gen là
+    numpy Generator dùng cho các phép sinh số theo lô (BlockStore, particle).
+    """
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self.gen = np.random.Generator(np.random.PCG64(seed))
+
+    def random(self):
+        return float(self.gen.random())
+
+    def randint(self, a, b):
+        """Số nguyên trong [a, b] (giống random.randint)"""
+        return int(self.gen.integers(a, b + 1))
+
+    def choice(self, seq):
+        return seq[int(self.gen.integers(len(seq)))]
+
+    def getstate(self):
+        return self.gen.bit_generator.state
+
+    def setstate(self, state):
+        self.gen.bit_generator.state = state
+
+    def copy(self):
+        """Luồng độc lập bắt đầu từ đúng trạng thái hiện tại"""
+        clone = GameRandom(self.seed)
+        clone.setstate(self.getstate())
+        return clone
+
+# Thứ tự xử lý các hẹn giờ đến hạn cùng một tick (giống thứ tự trong update())
+TIMER_ORDER = {
+    "shield_end": 0,
+    "boost_end": 0,
+    "event_end": 1,
+    "burst": 2,
+    "block_spawn": 3,
+    "powerup_spawn": 4,
+}
+
+def first_tick_after(t):
+    """Tick nguyên đầu tiên lớn hơn hẳn t"""
+    return math.floor(t) + 1
+
+class TimerQueue:
+    """Hàng đợi hẹn giờ (min-heap) theo tick của SimulationClock
+
+    Mỗi mục là tuple dữ liệu thuần (hạn, thứ tự loại, số thứ tự, loại, tham số)
+    nên có thể sao chép hoặc lưu lại nguyên vẹn. Mỗi frame chỉ tốn chi phí cho
+    các mục đã đến hạn; mục cùng hạn chạy theo TIMER_ORDER rồi theo thứ tự thêm.
+    """
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def clear(self):
+        self.heap.clear()
+        self.seq = 0
+
+    def snapshot(self):
+        """Các mục là tuple bất biến nên chỉ cần sao chép danh sách"""
+        return self.heap[:], self.seq
+
+    def restore(self, state):
+        heap, self.seq = state
+        self.heap[:] = heap
+
+    def schedule(self, due, kind, arg=None):
+        """Hẹn chạy (kind, arg) ở tick đầu tiên >= due"""
+        heapq.heappush(self.heap, (due, TIMER_ORDER[kind], self.seq, kind, arg))
+        self.seq += 1
+
+    def pop_due(self, tick):
+        """Lấy lần lượt các (kind, arg) có hạn <= tick"""
+        heap = self.heap
+        while heap and heap[0][0] <= tick:
+            entry = heapq.heappop(heap)
+            yield entry[3], entry[4]
+
+# Bitmask input của một frame (dùng cho replay và các nguồn input không phải bàn phím)
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_A = 4
+INPUT_D = 8
+INPUT_PAUSE = 16
+_INPUT_KEYS = ((INPUT_LEFT, pygame.K_LEFT), (INPUT_RIGHT, pygame.K_RIGHT),
+               (INPUT_A, pygame.K_a), (INPUT_D, pygame.K_d))
+
+def input_mask_from_keys(keys):
+    """Chuyển trạng thái phím (pygame.key.get_pressed() hoặc KeyState) sang bitmask"""
+    mask = 0
+    for bit, key in _INPUT_KEYS:
+        if keys[key]:
+            mask |= bit
+    return mask
+
+class KeyState:
+    """Trạng thái phím giả lập, truy cập giống kết quả của pygame.key.get_pressed()"""
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+    @classmethod
+    def from_mask(cls, mask):
+        return cls(key for bit, key in _INPUT_KEYS if mask & bit)
+
+class KeyboardInput:
+    """Đọc phím từ bàn phím thật"""
+    def get_keys(self, game_manager):
+        return pygame.key.get_pressed()
+
+class ScriptedInput:
+    """Input được điều khiển bởi hàm policy(game_manager) trả về danh sách phím đang nhấn"""
+    def __init__(self, policy=None):
+        self.policy = policy
+
+    def get_keys(self, game_manager):
+        if self.policy is None:
+            return KeyState()
+        return KeyState(self.policy(game_manager))
+
+# ===== SỰ KIỆN ĐẶC BIỆT =====
+# Mỗi event có một bit riêng; GameManager.event_mask là OR các bit đang active,
+# nên các vòng lặp nóng chỉ cần một phép AND thay vì tra chuỗi trong dict.
+
+EVENT_FLAGS = {}  # tên event -> bit
+
+def event_flag(name):
+    """Trả về bit của event (cấp bit mới nếu gặp tên lần đầu)"""
+    flag = EVENT_FLAGS.get(name)
+    if flag is None:
+        flag = 1 << len(EVENT_FLAGS)
+        EVENT_FLAGS[name] = flag
+    return flag
+
+EV_MIRROR_MODE = event_flag("MIRROR_MODE")
+EV_GRAVITY_FLIP = event_flag("GRAVITY_FLIP")
+EV_SPIRAL_BLOCKS = event_flag("SPIRAL_BLOCKS")
+EV_MAGNET_PULL = event_flag("MAGNET_PULL")
+EV_TELEPORT_BLOCKS = event_flag("TELEPORT_BLOCKS")
+EV_GHOST_BLOCKS = event_flag("GHOST_BLOCKS")
+EV_HIDDEN_BLOCKS = event_flag("HIDDEN_BLOCKS")
+EV_LASER_BEAM = event_flag("LASER_BEAM")
+EV_EARTHQUAKE = event_flag("EARTHQUAKE")
+EV_COLOR_CHANGE = event_flag("COLOR_CHANGE")
+# MAGNET_PULL của bản cổ điển chỉ hiện cảnh báo, không hút khối: bit riêng để
+# không đi vào nhánh MAGNET_PULL của BlockStore
+EV_CLASSIC_MAGNET_PULL = event_flag("CLASSIC_MAGNET_PULL")
+# Các event bẻ cong quỹ đạo rơi thẳng: khi có chúng BlockStore tính vị trí từng frame
+EV_STEPPED_BLOCKS = EV_GRAVITY_FLIP | EV_SPIRAL_BLOCKS | EV_MAGNET_PULL | EV_TELEPORT_BLOCKS
+
+class EventSpec:
+    """Khai báo một event: hàm kích hoạt, hàm chạy mỗi frame và hàm kết thúc
+
+    Các hàm nhận GameManager; hàm nào không cần thì để None.
+    """
+    def __init__(self, name, on_start=None, on_frame=None, on_end=None, flag=None):
+        self.name = name
+        self.flag = event_flag(name) if flag is None else flag
+        self.label = name.replace("_", " ")
+        self.on_start = on_start
+        self.on_frame = on_frame
+        self.on_end = on_end
+
+class EventRegistry:
+    """Tập các event mà một chế độ chơi có thể kích hoạt"""
+    def __init__(self):
+        self.specs = {}
+        self.names = []
+
+    def register(self, name, on_start=None, on_frame=None, on_end=None, flag=None):
+        """Thêm event; flag: bit riêng khi cùng tên nhưng khác hiệu ứng với bản khác"""
+        spec = EventSpec(name, on_start, on_frame, on_end, flag)
+        self.specs[name] = spec
+        self.names.append(name)
+        return spec
+
+    def get(self, name):
+        return self.specs[name]
+
+    def __len__(self):
+        return len(self.specs)
+
+def _reset_block_size(gm):
+    gm.block_size = BLOCK_SIZE
+
+def _reset_block_speed(gm):
+    gm.block_speed = INIT_BLOCK_SPEED + gm.level
+
+def _big_blocks_start(gm):
+    gm.block_size = int(BLOCK_SIZE * 1.8)
+
+def _tiny_blocks_start(gm):
+    gm.block_size = int(BLOCK_SIZE * 0.6)
+
+def _fast_blocks_start(gm):
+    gm.block_speed += 3
+    gm.score_multiplier = 3
+
+def _fast_blocks_end(gm):
+    _reset_block_speed(gm)
+    gm.score_multiplier = 1
+
+def _slow_motion_start(gm):
+    gm.block_speed = max(1, int(gm.block_speed * 0.3))
+    for player in gm.players:
+        player.speed = int(INIT_PLAYER_SPEED * 0.5)
+
+def _slow_motion_end(gm):
+    _reset_block_speed(gm)
+    for player in gm.players:
+        player.speed = INIT_PLAYER_SPEED
+
+def _block_rain_start(gm):
+    # Tạo nhiều khối liên tiếp
+    gm.schedule_spawns("block", 12, 0.08)
+
+def _color_change_start(gm):
+    # Đổi màu nền ngẫu nhiên
+    gm.bg_color = gm.rng.choice([BLUE, GREEN, PURPLE, ORANGE, PINK])
+
+def _color_change_end(gm):
+    gm.bg_color = gm.rules.bg_color
+
+def _gravity_flip_end(gm):
+    gm.block_speed = abs(gm.block_speed)
+
+def _invisible_player_start(gm):
+    for player in gm.players:
+        player.invisible = True
+
+def _invisible_player_end(gm):
+    for player in gm.players:
+        player.invisible = False
+
+def _double_score_start(gm):
+    gm.score_multiplier = 4
+
+def _double_score_end(gm):
+    gm.score_multiplier = 1
+
+def _freeze_blocks_start(gm):
+    gm.block_speed = 0
+
+def _earthquake_frame(gm):
+    gm.earthquake_offset = (gm.rng.randint(-5, 5), gm.rng.randint(-5, 5))
+
+def _earthquake_end(gm):
+    gm.earthquake_offset = (0, 0)
+
+def _laser_beam_start(gm):
+    gm.laser_y = HEIGHT * 0.7  # Laser ở 70% chiều cao màn hình
+
+def _laser_beam_end(gm):
+    gm.laser_y = -100
+
+def _shield_rain_start(gm):
+    # Tạo nhiều shield power-ups
+    gm.schedule_spawns("shield", 3, 0.5)
+
+# 18 events của phiên bản nâng cao. Các event chỉ thay đổi cách khối di chuyển
+# hoặc được vẽ (MIRROR, GHOST, SPIRAL...) không cần hàm riêng: BlockStore,
+# Player và GameManager đọc trực tiếp bit của chúng trong event_mask.
+ENHANCED_EVENTS = EventRegistry()
+ENHANCED_EVENTS.register("BIG_BLOCKS", on_start=_big_blocks_start, on_end=_reset_block_size)
+ENHANCED_EVENTS.register("TINY_BLOCKS", on_start=_tiny_blocks_start, on_end=_reset_block_size)
+ENHANCED_EVENTS.register("FAST_BLOCKS", on_start=_fast_blocks_start, on_end=_fast_blocks_end)
+ENHANCED_EVENTS.register("SLOW_MOTION", on_start=_slow_motion_start, on_end=_slow_motion_end)
+ENHANCED_EVENTS.register("MIRROR_MODE")
+ENHANCED_EVENTS.register("BLOCK_RAIN", on_start=_block_rain_start)
+ENHANCED_EVENTS.register("GHOST_BLOCKS")
+ENHANCED_EVENTS.register("COLOR_CHANGE", on_start=_color_change_start, on_end=_color_change_end)
+ENHANCED_EVENTS.register("GRAVITY_FLIP", on_end=_gravity_flip_end)
+ENHANCED_EVENTS.register("MAGNET_PULL")
+ENHANCED_EVENTS.register("INVISIBLE_PLAYER", on_start=_invisible_player_start,
+                         on_end=_invisible_player_end)
+ENHANCED_EVENTS.register("DOUBLE_SCORE", on_start=_double_score_start, on_end=_double_score_end)
+ENHANCED_EVENTS.register("FREEZE_BLOCKS", on_start=_freeze_blocks_start, on_end=_reset_block_speed)
+ENHANCED_EVENTS.register("SPIRAL_BLOCKS")
+ENHANCED_EVENTS.register("EARTHQUAKE", on_frame=_earthquake_frame, on_end=_earthquake_end)
+ENHANCED_EVENTS.register("LASER_BEAM", on_start=_laser_beam_start, on_end=_laser_beam_end)
+ENHANCED_EVENTS.register("SHIELD_RAIN", on_start=_shield_rain_start)
+ENHANCED_EVENTS.register("TELEPORT_BLOCKS")
+
+# 9 events của bản cổ điển (dodge_game.py): hiệu ứng nhẹ hơn và nền trắng
+def _classic_big_blocks_start(gm):
+    gm.block_size = int(BLOCK_SIZE * 1.5)
+
+def _classic_slow_player_start(gm):
+    for player in gm.players:
+        player.speed = INIT_PLAYER_SPEED * 0.5
+
+def _classic_slow_player_end(gm):
+    for player in gm.players:
+        player.speed = INIT_PLAYER_SPEED
+
+def _classic_fast_blocks_start(gm):
+    gm.block_speed += 3
+    gm.score_multiplier += 1
+
+def _classic_fast_blocks_end(gm):
+    gm.block_speed = INIT_BLOCK_SPEED
+    gm.score_multiplier = 1
+
+def _classic_color_change_start(gm):
+    gm.bg_color = tuple(gm.rng.randint(100, 255) for _ in range(3))
+
+def _classic_block_rain_start(gm):
+    for _ in range(10):
+        gm.spawn_block()
+
+CLASSIC_EVENTS = EventRegistry()
+CLASSIC_EVENTS.register("BIG_BLOCKS", on_start=_classic_big_blocks_start, on_end=_reset_block_size)
+CLASSIC_EVENTS.register("SLOW_PLAYER", on_start=_classic_slow_player_start,
+                        on_end=_classic_slow_player_end)
+CLASSIC_EVENTS.register("FAST_BLOCKS", on_start=_classic_fast_blocks_start,
+                        on_end=_classic_fast_blocks_end)
+CLASSIC_EVENTS.register("COLOR_CHANGE", on_start=_classic_color_change_start,
+                        on_end=_color_change_end)
+CLASSIC_EVENTS.register("HIDDEN_BLOCKS")
+CLASSIC_EVENTS.register("MIRROR_MODE")
+CLASSIC_EVENTS.register("GHOST_BLOCKS")
+CLASSIC_EVENTS.register("MAGNET_PULL", flag=EV_CLASSIC_MAGNET_PULL)
+CLASSIC_EVENTS.register("BLOCK_RAIN", on_start=_classic_block_rain_start)
+
+# ===== LUẬT CHƠI =====
+
+class Ruleset:
+    """Luật của một chế độ chơi chạy trên cùng engine GameManager
+
+    events: EventRegistry có thể kích hoạt; event_threshold: điểm tối thiểu để
+    bắt đầu có event; event_bonus: điểm thưởng khi sống sót qua một event;
+    levels: tăng level (tốc độ khối, nhịp spawn) theo điểm; powerups: có rơi
+    power-up; ghost_alpha: độ trong của khối GHOST_BLOCKS (0 = không vẽ);
+    detailed_hud: hiện level, event đang active và trạng thái power-up.
+    spawn_interval (ms) dùng khi không có level; blocks_per_spawn là số khối
+    mỗi lần spawn cho mỗi 400px bề ngang sân; invulnerable: va chạm không
+    kết thúc ván (stress mode).
+    """
+    def __init__(self, name, title, events, bg_color=BLACK, text_color=WHITE,
+                 event_threshold=50, event_bonus=15, levels=True, powerups=True,
+                 ghost_alpha=80, detailed_hud=True, show_menu=True,
+                 spawn_interval=BLOCK_SPAWN_INTERVAL, blocks_per_spawn=1, invulnerable=False):
+        self.name = name
+        self.title = title
+        self.events = events
+        self.bg_color = bg_color
+        self.text_color = text_color
+        self.event_threshold = event_threshold
+        self.event_bonus = event_bonus
+        self.levels = levels
+        self.powerups = powerups
+        self.ghost_alpha = ghost_alpha
+        self.detailed_hud = detailed_hud
+        self.show_menu = show_menu
+        self.spawn_interval = spawn_interval
+        self.blocks_per_spawn = blocks_per_spawn
+        self.invulnerable = invulnerable
+
+    def block_spawn_interval(self, level):
+        """Khoảng cách giữa hai lần spawn khối (ms) ở level này"""
+        if not self.levels:
+            return self.spawn_interval
+        return max(self.spawn_interval - level * 50, 300)
+
+    def spawn_count(self, arena_width):
+        """Số khối mỗi lần spawn, tăng theo bề ngang sân chơi"""
+        if self.blocks_per_spawn == 1:
+            return 1
+        return self.blocks_per_spawn * max(1, arena_width // DEFAULT_ARENA[0])
+
+ENHANCED_RULES = Ruleset("enhanced", "Enhanced Edition", ENHANCED_EVENTS)
+CLASSIC_RULES = Ruleset("classic", "Classic", CLASSIC_EVENTS, bg_color=WHITE, text_color=BLACK,
+                        event_threshold=20, event_bonus=10, levels=False, powerups=False,
+                        ghost_alpha=0, detailed_hud=False, show_menu=False)
+# Stress mode: 18 event của bản nâng cao, spawn dày theo kích thước sân và
+# người chơi bất tử, để đo engine với hàng nghìn khối cùng lúc (--arena lớn)
+STRESS_RULES = Ruleset("stress", "Stress Test", ENHANCED_EVENTS, levels=False,
+                       spawn_interval=50, blocks_per_spawn=8, invulnerable=True,
+                       show_menu=False)
+# Thứ tự cố định: chỉ số trong tuple được ghi vào file replay
+RULESETS = (ENHANCED_RULES, CLASSIC_RULES, STRESS_RULES)
+RULESETS_BY_NAME = {rules.name: rules for rules in RULESETS}
 
 # ===== CLASSES CHO GAME OBJECTS =====
 
 class Player:
     """Class đại diện cho người chơi"""
+    __slots__ = ("x", "y", "width", "height", "speed", "color", "shield_active",
+                 "shield_timer", "speed_boost_active", "speed_boost_timer", "invisible",
+                 "alive")
+
     def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Về trạng thái đầu ván (Player được giữ lại qua reset_game)"""
         self.x = WIDTH // 2 - PLAYER_SIZE // 2
         self.y = HEIGHT - PLAYER_SIZE - 10
         self.width = PLAYER_SIZE
@@ -75,8 +634,16 @@ class Player:
         self.speed_boost_active = False
         self.speed_boost_timer = 0
         self.invisible = False
+        self.alive = True  # versus: False khi đã bị loại
+
+    def snapshot(self):
+        return tuple([getattr(self, name) for name in Player.__slots__])
+
+    def restore(self, state):
+        for name, value in zip(Player.__slots__, state):
+            setattr(self, name, value)
         
-    def update(self, keys, mirror_mode=False):
+    def update(self, keys, mirror_mode):
         """Cập nhật vị trí người chơi dựa trên input"""
         # Xử lý mirror mode (đảo ngược điều khiển)
         direction = -1 if mirror_mode else 1
@@ -88,193 +655,698 @@ class Player:
             
         # Giới hạn trong màn hình
         self.x = max(0, min(WIDTH - self.width, self.x))
-        
-        # Cập nhật timer cho các hiệu ứng
-        current_time = time.time() * 1000
-        if self.shield_active and current_time > self.shield_timer:
-            self.shield_active = False
-        if self.speed_boost_active and current_time > self.speed_boost_timer:
-            self.speed_boost_active = False
-            self.speed = INIT_PLAYER_SPEED
     
-    def draw(self, screen, earthquake_offset=(0, 0)):
-        """Vẽ người chơi lên màn hình"""
+    def sprites(self, batch, earthquake_offset=(0, 0), x=None):
+        """Thêm sprite của người chơi (và vòng shield) vào batch để blit một lần
+
+        x: vị trí vẽ nếu khác self.x (nội suy giữa hai tick).
+        """
         x_offset, y_offset = earthquake_offset
-        
+        if x is not None:
+            x_offset += x - self.x
+
         # Vẽ shield nếu đang active
         if self.shield_active:
-            pygame.draw.circle(screen, CYAN, 
-                             (int(self.x + self.width//2 + x_offset), 
-                              int(self.y + self.height//2 + y_offset)), 
-                             self.width//2 + 10, 3)
-        
+            radius = self.width//2 + 10
+            batch.append((sprite_cache.ring(radius, CYAN, 3),
+                          (int(self.x + self.width//2 + x_offset) - radius - 1,
+                           int(self.y + self.height//2 + y_offset) - radius - 1)))
+
         # Màu sắc thay đổi khi có speed boost
         color = ORANGE if self.speed_boost_active else self.color
-        
-        # Độ trong suốt khi invisible
-        if self.invisible:
-            # Tạo surface tạm với alpha
-            temp_surface = pygame.Surface((self.width, self.height))
-            temp_surface.set_alpha(80)  # 80/255 = ~30% opacity
-            temp_surface.fill(color)
-            screen.blit(temp_surface, (self.x + x_offset, self.y + y_offset))
-        else:
-            pygame.draw.rect(screen, color, 
-                           (self.x + x_offset, self.y + y_offset, self.width, self.height))
+
+        # Độ trong suốt khi invisible (80/255 = ~30% opacity)
+        alpha = 80 if self.invisible else 255
+        batch.append((sprite_cache.rect(self.width, self.height, color, alpha),
+                      (self.x + x_offset, self.y + y_offset)))
     
     def get_rect(self):
         """Trả về pygame.Rect cho collision detection"""
         return pygame.Rect(self.x, self.y, self.width, self.height)
 
-class Block:
-    """Class đại diện cho khối rơi"""
-    def __init__(self, x, y, size=BLOCK_SIZE, speed=INIT_BLOCK_SPEED):
-        self.x = x
-        self.y = y
-        self.width = size
-        self.height = size
-        self.speed = speed
+BAND_WINDOW = 32  # số tick mỗi lần dựng lại danh sách khối có thể chạm người chơi
+
+class BlockStore:
+    """Lưu toàn bộ khối rơi dạng struct-of-arrays (NumPy) để xử lý theo lô
+
+    Mỗi thuộc tính (x, kích thước, tốc độ, thời điểm tạo...) là một mảng liên
+    tục; chỉ count phần tử đầu tiên là khối đang tồn tại, theo thứ tự spawn.
+
+    Khi không có event nào bẻ cong quỹ đạo, khối rơi thẳng đều nên vị trí có
+    dạng đóng: y = y0 + speed * (tick - anchor). update() khi đó chỉ ghi lại
+    tick, y được tính khi có người đọc (vẽ), và tick khối rơi khỏi màn hình
+    đã biết từ lúc spawn: các frame trước hạn sớm nhất (_next_exit) không phải
+    xét việc xóa khối/cộng điểm. Va chạm chỉ tính y cho các khối có thể đi qua
+    dải của người chơi trong BAND_WINDOW tick tới (band_candidates). Chỉ khi
+    có event trong EV_STEPPED_BLOCKS khối mới được tính từng frame như trước.
+    """
+    def __init__(self, capacity=64):
+        self.count = 0
         self.color = RED
-        self.original_x = x  # Lưu vị trí gốc cho spiral effect
-        self.creation_time = time.time()
-        
-    def update(self, active_events, player_x):
-        """Cập nhật vị trí khối dựa trên các event đang active"""
-        # Di chuyển cơ bản
-        move_x = 0
-        move_y = self.speed
-        
-        # Xử lý các event đặc biệt
-        if "GRAVITY_FLIP" in active_events:
-            move_y = -abs(self.speed)  # Bay lên thay vì rơi xuống
-            
-        if "SPIRAL_BLOCKS" in active_events:
+        self.tick = 0           # tick của lần update() gần nhất
+        self._y_tick = 0        # tick mà _y đang phản ánh
+        self._stepping = False  # frame trước có tính từng frame không
+        self._next_exit = np.inf  # tick sớm nhất có khối rơi khỏi màn hình
+        self._next_id = 0
+        self._band = None       # dải (top, bottom) của danh sách ứng viên va chạm
+        self._band_idx = None   # chỉ số các khối có thể ở trong dải trước _band_until
+        self._band_until = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """Cấp phát (hoặc mở rộng) các mảng, giữ lại dữ liệu cũ
+
+        Mọi thuộc tính nằm trong một mảng 2 chiều _data (mỗi hàng một thuộc
+        tính), nên dồn mảng hay chụp snapshot chỉ là một phép copy.
+        """
+        old = getattr(self, "_data", None)
+        self.capacity = capacity
+        self._data = np.zeros((9, capacity))
+        # _y: cache vị trí tại _y_tick; _y0: vị trí tại tick anchor;
+        # _exit: tick rơi khỏi màn hình khi rơi thẳng; _id: số hiệu tăng dần
+        # theo thứ tự spawn (client mạng nhận diện khối theo số này)
+        (self._x, self._y, self._y0, self._anchor, self._size,
+         self._speed, self._born, self._exit, self._id) = self._data
+        if old is not None:
+            self._data[:, :self.count] = old[:, :self.count]
+
+    def __len__(self):
+        return self.count
+
+    # Các view chỉ chứa khối đang tồn tại
+    @property
+    def x(self):
+        return self._x[:self.count]
+
+    @property
+    def y(self):
+        """Vị trí y tại tick hiện tại (tính lại theo dạng đóng nếu cần)"""
+        y = self._y[:self.count]
+        if self._y_tick != self.tick:
+            np.subtract(self.tick, self._anchor[:self.count], out=y)
+            y *= self._speed[:self.count]
+            y += self._y0[:self.count]
+            self._y_tick = self.tick
+        return y
+
+    @property
+    def size(self):
+        return self._size[:self.count]
+
+    @property
+    def speed(self):
+        return self._speed[:self.count]
+
+    @property
+    def born(self):
+        return self._born[:self.count]
+
+    @property
+    def ids(self):
+        return self._id[:self.count]
+
+    def clear(self):
+        """Xóa hết khối (giữ nguyên bộ nhớ đã cấp phát)"""
+        self.count = 0
+        self.tick = 0
+        self._y_tick = 0
+        self._stepping = False
+        self._next_exit = np.inf
+        self._next_id = 0
+        self._band_idx = None
+
+    def _exit_tick(self, y, speed):
+        """Tick đầu tiên mà y > HEIGHT với khối mới ở độ cao y (inf nếu đứng yên)"""
+        if speed <= 0:
+            return np.inf
+        exit_tick = self.tick + (HEIGHT - y) // speed + 1
+        if exit_tick < self._next_exit:
+            self._next_exit = exit_tick
+        return exit_tick
+
+    def add_many(self, xs, y, size, speed, creation_tick):
+        """Thêm len(xs) khối cùng độ cao/kích thước/tốc độ trong một lần (stress mode)"""
+        n = len(xs)
+        needed = self.count + n
+        if needed > self.capacity:
+            capacity = self.capacity
+            while capacity < needed:
+                capacity *= 2
+            self._allocate(capacity)
+        start, end = self.count, needed
+        self._x[start:end] = xs
+        self._y[start:end] = y
+        self._y0[start:end] = y
+        self._anchor[start:end] = self.tick
+        self._size[start:end] = size
+        self._speed[start:end] = speed
+        self._born[start:end] = creation_tick
+        self._exit[start:end] = self._exit_tick(y, speed)
+        self._check_band(y, size, speed)
+        self._id[start:end] = np.arange(self._next_id, self._next_id + n)
+        self._next_id += n
+        self.count = end
+    
+    def add(self, x, y, size, speed, creation_tick):
+        """Thêm một khối mới, trả về chỉ số của khối"""
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        self._x[i] = x
+        self._y[i] = y
+        self._y0[i] = y
+        self._anchor[i] = self.tick
+        self._size[i] = size
+        self._speed[i] = speed
+        self._born[i] = creation_tick
+        self._exit[i] = self._exit_tick(y, speed)
+        self._check_band(y, size, speed)
+        self._id[i] = self._next_id
+        self._next_id += 1
+        self.count += 1
+        return i
+
+    def update(self, event_mask, player_x, tick, rng):
+        """Cập nhật vị trí tất cả khối dựa trên các event đang active (event_mask)"""
+        if not event_mask & EV_STEPPED_BLOCKS:
+            if self._stepping:
+                # Vừa hết event: vị trí hiện tại là gốc của quỹ đạo rơi thẳng
+                self._stepping = False
+                self._update_exits()
+            self.tick = tick
+            return
+
+        n = self.count
+        x, y, size, speed = self.x, self.y, self.size, self.speed
+        self._stepping = True
+        self._band_idx = None
+        self.tick = self._y_tick = tick
+        if n == 0:
+            return
+
+        if event_mask & EV_TELEPORT_BLOCKS:
+            # Ngẫu nhiên dịch chuyển (0.5% mỗi khối mỗi frame)
+            jump = rng.gen.random(n) < 0.005
+            if jump.any():
+                x[jump] = rng.gen.integers(0, WIDTH - size[jump] + 1)
+
+        # Di chuyển cơ bản (GRAVITY_FLIP: bay lên thay vì rơi xuống)
+        if event_mask & EV_GRAVITY_FLIP:
+            y -= np.abs(speed)
+        else:
+            y += speed
+
+        if event_mask & EV_SPIRAL_BLOCKS:
             # Di chuyển theo hình xoắn ốc
-            time_factor = (time.time() - self.creation_time) * 3
-            move_x = math.sin(time_factor) * 2
-            
-        if "MAGNET_PULL" in active_events:
+            x += np.sin((tick - self.born) * (3.0 / FPS)) * 2
+
+        if event_mask & EV_MAGNET_PULL:
             # Bị hút về phía người chơi
             player_center = player_x + PLAYER_SIZE // 2
-            block_center = self.x + self.width // 2
-            attraction = (player_center - block_center) * 0.05
-            move_x += attraction
-            
-        if "TELEPORT_BLOCKS" in active_events:
-            # Ngẫu nhiên dịch chuyển
-            if random.random() < 0.005:  # 0.5% chance mỗi frame
-                self.x = random.randint(0, WIDTH - self.width)
-        
-        # Áp dụng di chuyển
-        self.x += move_x
-        self.y += move_y
-        
+            x += (player_center - (x + size // 2)) * 0.05
+
         # Giữ trong màn hình (trục X)
-        self.x = max(0, min(WIDTH - self.width, self.x))
-    
-    def draw(self, screen, active_events, earthquake_offset=(0, 0)):
-        """Vẽ khối lên màn hình với các hiệu ứng đặc biệt"""
-        x_offset, y_offset = earthquake_offset
-        
-        # Kiểm tra các hiệu ứng ẩn
-        if "HIDDEN_BLOCKS" in active_events and self.y > HEIGHT // 2:
-            return  # Không vẽ nếu ở nửa dưới màn hình
-            
-        if "GHOST_BLOCKS" in active_events and random.random() < 0.3:
-            # Tạo hiệu ứng trong suốt
-            temp_surface = pygame.Surface((self.width, self.height))
-            temp_surface.set_alpha(80)
-            temp_surface.fill(self.color)
-            screen.blit(temp_surface, (self.x + x_offset, self.y + y_offset))
+        np.clip(x, 0, WIDTH - size, out=x)
+        self._y0[:n] = y
+        self._anchor[:n] = tick
+
+    def _update_exits(self):
+        """Tính lại tick rơi khỏi màn hình từ vị trí gốc (sau một đoạn tính từng frame)"""
+        n = self.count
+        speed = self._speed[:n]
+        exits = self._exit[:n]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.floor((HEIGHT - self._y0[:n]) / speed, out=exits)
+        exits += self._anchor[:n] + 1
+        exits[speed <= 0] = np.inf
+        self._next_exit = exits.min() if n else np.inf
+
+    def _in_band_soon(self, y0, anchor, size, speed, top, bottom):
+        """Khối (rơi thẳng) có thể chạm dải [top, bottom) từ tick hiện tại tới _band_until
+
+        y tuyến tính theo tick nên chỉ cần so khoảng y đầu/cuối cửa sổ, nới 1px
+        cho phần làm tròn của np.trunc.
+        """
+        y_now = y0 + speed * (self.tick - anchor)
+        y_end = y0 + speed * (self._band_until - anchor)
+        return ((np.maximum(y_now, y_end) + size > top - 1) &
+                (np.minimum(y_now, y_end) < bottom + 1))
+
+    def _check_band(self, y, size, speed):
+        """Khối mới có thể vào dải trước khi danh sách ứng viên hết hạn thì dựng lại"""
+        if self._band_idx is not None and self._in_band_soon(y, self.tick, size, speed,
+                                                              *self._band):
+            self._band_idx = None
+
+    def band_candidates(self, top, bottom):
+        """(chỉ số, y hiện tại) của các khối có thể nằm trong dải [top, bottom)
+
+        Khi rơi thẳng, danh sách ứng viên được dựng một lần cho BAND_WINDOW
+        tick (hoặc tới khi khối bị xóa/thêm khối vào dải), các frame còn lại
+        chỉ tính y cho ứng viên. Trong lúc tính từng frame: trả về mọi khối.
+        """
+        if self._stepping:
+            return np.arange(self.count), self.y
+        tick = self.tick
+        if self._band_idx is None or self._band != (top, bottom) or tick >= self._band_until:
+            n = self.count
+            self._band = (top, bottom)
+            self._band_until = tick + BAND_WINDOW
+            self._band_idx = np.flatnonzero(self._in_band_soon(
+                self._y0[:n], self._anchor[:n], self._size[:n], self._speed[:n], top, bottom))
+        idx = self._band_idx
+        y = self._speed[idx] * (tick - self._anchor[idx])
+        y += self._y0[idx]
+        return idx, y
+
+    def remove_offscreen(self, gravity_flip):
+        """Xóa các khối đã ra khỏi màn hình, trả về số khối bị xóa"""
+        if self.count == 0:
+            return 0
+        if not self._stepping:
+            return self._remove_expired()
+        if gravity_flip:
+            gone = self.y < -self.size
         else:
-            pygame.draw.rect(screen, self.color, 
-                           (self.x + x_offset, self.y + y_offset, self.width, self.height))
-    
-    def get_rect(self):
-        """Trả về pygame.Rect cho collision detection"""
-        return pygame.Rect(self.x, self.y, self.width, self.height)
+            gone = self.y > HEIGHT
+        removed = int(np.count_nonzero(gone))
+        if removed:
+            self._compact(~gone)
+        return removed
+
+    def _remove_expired(self):
+        """Xóa các khối có tick rơi khỏi màn hình <= tick hiện tại"""
+        if self.tick < self._next_exit:
+            return 0
+        keep = self._exit[:self.count] > self.tick
+        removed = self.count - int(np.count_nonzero(keep))
+        if removed:
+            self._compact(keep)
+        self._next_exit = self._exit[:self.count].min() if self.count else np.inf
+        return removed
+
+    def _compact(self, keep):
+        """Dồn các khối còn giữ lại lên đầu mảng (giữ thứ tự spawn)"""
+        kept = int(np.count_nonzero(keep))
+        self._data[:, :kept] = self._data[:, :self.count][:, keep]
+        self.count = kept
+        self._band_idx = None
+
+    def snapshot(self):
+        """Bản sao trạng thái (dùng cho GameManager.snapshot)"""
+        return (self._data[:, :self.count].copy(), self.tick, self._y_tick,
+                self._stepping, self._next_exit, self._next_id)
+
+    def restore(self, state):
+        data, self.tick, self._y_tick, self._stepping, self._next_exit, self._next_id = state
+        n = data.shape[1]
+        if n > self.capacity:
+            self.count = 0
+            self._allocate(max(n, self.capacity * 2))
+        self._data[:, :n] = data
+        self.count = n
+        self._band_idx = None
+
+    def rects(self, earthquake_offset=(0, 0), positions=None):
+        """Danh sách vùng màn hình mà các khối chiếm (cho dirty-rect rendering)"""
+        x_offset, y_offset = earthquake_offset
+        x, y = positions if positions is not None else (self.x, self.y)
+        xs = (x + x_offset).astype(np.int32).tolist()
+        ys = (y + y_offset).astype(np.int32).tolist()
+        sizes = (self.size + 2).astype(np.int32).tolist()
+        return [(bx - 1, by - 1, size, size) for bx, by, size in zip(xs, ys, sizes)]
+
+    def sprites(self, batch, event_mask, earthquake_offset=(0, 0), fx_rng=None, ghost_alpha=80,
+                positions=None):
+        """Thêm sprite của tất cả khối (với các hiệu ứng đặc biệt) vào batch
+
+        fx_rng: nguồn ngẫu nhiên riêng cho hiệu ứng hình ảnh, để việc vẽ không
+        làm thay đổi luồng ngẫu nhiên của mô phỏng. ghost_alpha: độ trong của
+        khối GHOST_BLOCKS (0 = bỏ hẳn không vẽ, như bản cổ điển). positions:
+        (x, y) dùng để vẽ thay cho vị trí hiện tại (nội suy giữa hai tick).
+        """
+        n = self.count
+        if n == 0:
+            return
+        x, y = positions if positions is not None else (self.x, self.y)
+        size = self.size
+        if event_mask & EV_HIDDEN_BLOCKS:
+            # Không vẽ nếu ở nửa dưới màn hình
+            visible = y <= HEIGHT // 2
+            x, y, size = x[visible], y[visible], size[visible]
+            n = size.size
+        # Mã sprite = kích thước * 2 + ghost: một lần tra cache cho mỗi loại
+        codes = size.astype(np.int64) * 2
+        if event_mask & EV_GHOST_BLOCKS:
+            # Hiệu ứng trong suốt ngẫu nhiên
+            ghost = fx_rng.random(n) < 0.3
+            if ghost_alpha:
+                codes += ghost
+            else:
+                x, y, codes = x[~ghost], y[~ghost], codes[~ghost]
+        x_offset, y_offset = earthquake_offset
+        xs = (x + x_offset).tolist()
+        ys = (y + y_offset).tolist()
+        sprites = {code: sprite_cache.rect(code // 2, code // 2, self.color,
+                                           ghost_alpha if code & 1 else 255)
+                   for code in np.unique(codes).tolist()}
+        batch.extend([(sprites[code], (bx, by)) for code, bx, by in zip(codes.tolist(), xs, ys)])
+
+# Màu và ký hiệu theo loại power-up
+POWERUP_STYLES = {
+    "shield": (CYAN, "S"),
+    "speed": (PURPLE, "+"),
+    "score": (YELLOW, "*"),
+}
 
 class PowerUp:
-    """Class đại diện cho power-up"""
+    """Class đại diện cho power-up (tái sử dụng qua PowerUpPool)"""
+    __slots__ = ("x", "y", "width", "height", "speed", "type", "color", "symbol")
+
     def __init__(self, x, y, power_type):
-        self.x = x
-        self.y = y
         self.width = POWERUP_SIZE
         self.height = POWERUP_SIZE
-        self.speed = 2
+        self.speed = POWERUP_SPEED
+        self.reset(x, y, power_type)
+    
+    def reset(self, x, y, power_type):
+        """Gán lại vị trí và loại (khi lấy lại từ free list)"""
+        self.x = x
+        self.y = y
         self.type = power_type
-        self.collected = False
-        
-        # Màu sắc theo loại
-        if power_type == "shield":
-            self.color = CYAN
-            self.symbol = "S"
-        elif power_type == "speed":
-            self.color = PURPLE
-            self.symbol = "+"
-        elif power_type == "score":
-            self.color = YELLOW
-            self.symbol = "*"
+        self.color, self.symbol = POWERUP_STYLES[power_type]
     
     def update(self):
         """Cập nhật vị trí power-up"""
         self.y += self.speed
     
-    def draw(self, screen):
-        """Vẽ power-up lên màn hình"""
-        pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
-        # Vẽ ký hiệu
-        text = font_medium.render(self.symbol, True, BLACK)
-        text_rect = text.get_rect(center=(self.x + self.width//2, self.y + self.height//2))
-        screen.blit(text, text_rect)
+    def sprite(self):
+        """Sprite ô màu có ký hiệu, vẽ sẵn một lần cho mỗi loại power-up"""
+        return sprite_cache.labeled_rect(self.width, self.color, self.symbol, get_font(FONT_MEDIUM), BLACK)
     
     def get_rect(self):
         """Trả về pygame.Rect cho collision detection"""
         return pygame.Rect(self.x, self.y, self.width, self.height)
 
-class Particle:
-    """Class cho hiệu ứng particle khi thu thập power-up"""
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.vx = random.uniform(-3, 3)
-        self.vy = random.uniform(-3, 3)
-        self.color = color
-        self.life = 60  # 60 frames = 1 giây ở 60 FPS
-        self.max_life = 60
-        self.size = random.randint(2, 5)
-    
+class PowerUpPool:
+    """Free list các PowerUp đã dùng xong, tái sử dụng qua các frame và các ván"""
+    def __init__(self):
+        self.free = []
+
+    def acquire(self, x, y, power_type):
+        if self.free:
+            powerup = self.free.pop()
+            powerup.reset(x, y, power_type)
+            return powerup
+        return PowerUp(x, y, power_type)
+
+    def release(self, powerup):
+        self.free.append(powerup)
+
+    def release_all(self, powerups):
+        self.free.extend(powerups)
+
+PARTICLE_LIFE = 60  # 60 frames = 1 giây ở 60 FPS
+PARTICLE_ALPHA_BUCKETS = 16
+
+class ParticlePool:
+    """Hệ thống particle dung lượng cố định, lưu dạng mảng NumPy
+
+    Vị trí, vận tốc và tuổi thọ được cập nhật theo lô; hình tròn được vẽ sẵn
+    và cache theo (màu, kích thước, mức alpha) nên khi chơi không phải tạo
+    Surface mới cho từng particle. Khi pool đầy, particle mới bị bỏ qua.
+    """
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.count = 0
+        # Hai khối bộ nhớ (số thực, số nguyên), mỗi hàng một thuộc tính
+        self._floats = np.zeros((4, capacity))
+        self._ints = np.zeros((3, capacity), dtype=np.int32)
+        self.x, self.y, self.vx, self.vy = self._floats
+        self.life, self.size, self.color = self._ints
+        self.palette = []  # color id -> màu RGB
+        self._color_ids = {}
+        self._sprites = {}  # (color id, size, alpha bucket) -> Surface
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        """Xóa hết particle (giữ nguyên bộ nhớ và cache sprite)"""
+        self.count = 0
+
+    def _color_id(self, color):
+        color_id = self._color_ids.get(color)
+        if color_id is None:
+            color_id = len(self.palette)
+            self.palette.append(color)
+            self._color_ids[color] = color_id
+        return color_id
+
+    def emit(self, x, y, color, count, rng):
+        """Tạo count particle bay tỏa ra từ (x, y)"""
+        start = self.count
+        end = min(start + count, self.capacity)
+        n = end - start
+        if n <= 0:
+            return
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = rng.gen.uniform(-3, 3, n)
+        self.vy[start:end] = rng.gen.uniform(-3, 3, n)
+        self.life[start:end] = PARTICLE_LIFE
+        self.size[start:end] = rng.gen.integers(2, 6, n)
+        self.color[start:end] = self._color_id(color)
+        self.count = end
+
     def update(self):
-        """Cập nhật particle"""
-        self.x += self.vx
-        self.y += self.vy
-        self.life -= 1
+        """Cập nhật toàn bộ particle và loại bỏ particle đã hết tuổi thọ"""
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.life[:n] -= 1
         # Giảm tốc độ dần
-        self.vx *= 0.98
-        self.vy *= 0.98
-    
-    def draw(self, screen):
-        """Vẽ particle với alpha dựa trên life"""
-        if self.life > 0:
-            alpha = int(255 * (self.life / self.max_life))
-            temp_surface = pygame.Surface((self.size * 2, self.size * 2))
-            temp_surface.set_alpha(alpha)
-            pygame.draw.circle(temp_surface, self.color, (self.size, self.size), self.size)
-            screen.blit(temp_surface, (self.x - self.size, self.y - self.size))
+        self.vx[:n] *= 0.98
+        self.vy[:n] *= 0.98
+
+        alive = self.life[:n] > 0
+        kept = int(np.count_nonzero(alive))
+        if kept < n:
+            self._floats[:, :kept] = self._floats[:, :n][:, alive]
+            self._ints[:, :kept] = self._ints[:, :n][:, alive]
+            self.count = kept
+
+    def snapshot(self):
+        """Bản sao các particle đang sống kèm bảng màu mà id màu tham chiếu tới"""
+        n = self.count
+        return self._floats[:, :n].copy(), self._ints[:, :n].copy(), tuple(self.palette)
+
+    def restore(self, state):
+        floats, ints, palette = state
+        if tuple(self.palette[:len(palette)]) != palette:
+            # Snapshot từ pool khác (ví dụ GameManager vừa fork): dùng bảng màu của nó
+            self.palette = list(palette)
+            self._color_ids = {color: i for i, color in enumerate(palette)}
+            self._sprites.clear()
+        n = floats.shape[1]
+        self._floats[:, :n] = floats
+        self._ints[:, :n] = ints
+        self.count = n
+
+    def bounding_rect(self):
+        """Hình chữ nhật bao tất cả particle, None nếu không còn particle nào"""
+        n = self.count
+        if n == 0:
+            return None
+        size = self.size[:n]
+        left = int((self.x[:n] - size).min()) - 1
+        top = int((self.y[:n] - size).min()) - 1
+        right = int((self.x[:n] + size).max()) + 2
+        bottom = int((self.y[:n] + size).max()) + 2
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def _sprite(self, color_id, size, bucket):
+        """Lấy (hoặc vẽ sẵn) hình tròn cho một tổ hợp màu/kích thước/alpha"""
+        key = (color_id, size, bucket)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((size * 2, size * 2))
+            sprite.set_alpha(bucket * 255 // (PARTICLE_ALPHA_BUCKETS - 1))
+            pygame.draw.circle(sprite, self.palette[color_id], (size, size), size)
+            self._sprites[key] = sprite
+        return sprite
+
+    def sprites(self, batch):
+        """Thêm sprite của mọi particle (alpha dựa trên life) vào batch"""
+        n = self.count
+        if n == 0:
+            return
+        size = self.size[:n]
+        alpha = 255 * self.life[:n] // PARTICLE_LIFE
+        buckets = (alpha * (PARTICLE_ALPHA_BUCKETS - 1) // 255).tolist()
+        xs = (self.x[:n] - size).tolist()
+        ys = (self.y[:n] - size).tolist()
+        sprite = self._sprite
+        batch.extend([(sprite(c, s, b), (x, y)) for c, s, b, x, y in
+                      zip(self.color[:n].tolist(), size.tolist(), buckets, xs, ys)])
+
+# ===== BROAD-PHASE VA CHẠM =====
+
+class CollisionIndex:
+    """Broad-phase dùng chung cho va chạm khối, power-up và laser beam
+
+    Người chơi luôn nằm trong một dải ngang hẹp gần đáy màn hình, nên chỉ các
+    vật thể có khoảng y giao với dải đó mới được kiểm tra chính xác theo trục x.
+    Các phép so sánh giống hệt pygame.Rect.colliderect nhưng không tạo Rect mới.
+    """
+    def __init__(self):
+        self.set_target(pygame.Rect(0, 0, 0, 0))
+    
+    def set_target(self, rect):
+        """Đặt hình chữ nhật của người chơi cho frame hiện tại"""
+        self.left = rect.left
+        self.right = rect.right
+        self.top = rect.top
+        self.bottom = rect.bottom
+    
+    def in_band(self, top, bottom):
+        """Khoảng [top, bottom) có giao với dải của người chơi không"""
+        return top < self.bottom and self.top < bottom
+    
+    def block_candidates(self, blocks):
+        """Chỉ số các khối nằm trong dải của người chơi"""
+        idx, y = blocks.band_candidates(self.top, self.bottom)
+        by = np.trunc(y)
+        return idx[(by < self.bottom) & (by + blocks.size[idx] > self.top)]
+    
+    def hits_blocks(self, blocks):
+        """Có khối nào chạm người chơi không"""
+        if len(blocks) == 0:
+            return False
+        idx = self.block_candidates(blocks)
+        if idx.size == 0:
+            return False
+        bx = np.trunc(blocks.x[idx])
+        return bool(((bx < self.right) & (bx + blocks.size[idx] > self.left)).any())
+    
+    def powerup_hits(self, powerups):
+        """Chỉ số các power-up chạm người chơi
+
+        Power-up đều rơi cùng tốc độ từ cùng độ cao nên danh sách luôn được sắp
+        theo y giảm dần: bỏ qua phần đã rơi qua dải và dừng ở cái đầu tiên còn ở trên.
+        """
+        hits = []
+        for i, powerup in enumerate(powerups):
+            if powerup.y >= self.bottom:
+                continue
+            if powerup.y + powerup.height <= self.top:
+                break
+            if powerup.x < self.right and self.left < powerup.x + powerup.width:
+                hits.append(i)
+        return hits
+    
+    def hits_laser(self, laser_y):
+        """Laser beam (dày 10px quanh laser_y) có chạm người chơi không"""
+        return self.in_band(laser_y - 5, laser_y + 5)
+
+# ===== SNAPSHOT TRẠNG THÁI GAME =====
+
+# Các thuộc tính kiểu giá trị (số, chuỗi, tuple) của GameManager có trong snapshot.
+# Trạng thái riêng của việc vẽ (drawn_bg_color, last_presented_bg_color) không nằm ở đây.
+SNAPSHOT_FIELDS = ("seed", "score", "level", "block_speed", "block_size", "score_multiplier",
+                   "next_event_time", "event_mask", "warning_text", "warning_timer",
+                   "bg_color", "earthquake_offset", "laser_y", "game_over", "death_cause",
+                   "paused")
+
+class GameSnapshot:
+    """Toàn bộ trạng thái mô phỏng của một GameManager tại một tick
+
+    Chỉ gồm dữ liệu thuần: mảng NumPy đã sao chép (khối, particle), tuple
+    (player, power-up, hẹn giờ) và trạng thái RNG. Snapshot không bao giờ bị
+    sửa nên có thể restore() nhiều lần hoặc dùng chung giữa nhiều GameManager.
+    """
+    __slots__ = ("rules", "tick", "fields", "rng", "fx_rng", "players", "blocks", "powerups",
+                 "particles", "timers", "active_events", "event_end_times", "frame_hooks",
+                 "events_triggered")
+
+    def __init__(self, game):
+        self.rules = game.rules
+        self.tick = game.clock.tick
+        self.fields = tuple([getattr(game, name) for name in SNAPSHOT_FIELDS])
+        self.rng = game.rng.getstate()
+        self.fx_rng = game.fx_rng.bit_generator.state
+        self.players = tuple([player.snapshot() for player in game.players])
+        self.blocks = game.blocks.snapshot()
+        self.powerups = tuple([(p.x, p.y, p.type) for p in game.powerups])
+        self.particles = game.particles.snapshot()
+        self.timers = game.timers.snapshot()
+        self.active_events = dict(game.active_events)
+        self.event_end_times = dict(game.event_end_times)
+        self.frame_hooks = tuple(game.frame_hooks)
+        self.events_triggered = tuple(game.events_triggered)
 
 # ===== GAME MANAGER CLASS =====
 
 class GameManager:
-    """Class quản lý toàn bộ game logic"""
-    def __init__(self):
-        self.reset_game()
+    """Class quản lý toàn bộ game logic
+
+    Mỗi lần update() tiến đúng một tick của SimulationClock; mọi số ngẫu nhiên
+    lấy từ self.rng (seed lưu ở self.seed). Mặc định đọc bàn phím; truyền
+    input_source khác (ví dụ ScriptedInput) để chạy headless. scores là
+    ScoreStore nhận kết quả mỗi ván (None: không lưu điểm). Gán telemetry
+    (dodge_telemetry.Telemetry) để ghi lại event, cái chết, power-up, level.
+
+    num_players > 1 là chế độ versus: mọi người chơi né trong cùng một thế
+    giới (self.players, self.player là người chơi 0), mỗi frame chạy bằng
+    update_players(); người chơi chạm khối/laser bị loại, ván kết thúc khi
+    không còn ai.
+    """
+    def __init__(self, clock=None, input_source=None, scores=None, rules=None,
+                 seed=None, num_players=1):
+        self.num_players = num_players
+        self.rules = rules if rules is not None else ENHANCED_RULES
+        self.events = self.rules.events
+        self.clock = clock if clock is not None else SimulationClock()
+        self.input_source = input_source if input_source is not None else KeyboardInput()
+        self.scores = scores
+        self.profiler = NULL_PROFILER
+        self.telemetry = NULL_TELEMETRY
+        self.reset_game(seed)
         
-    def reset_game(self):
-        """Reset game về trạng thái ban đầu"""
-        self.player = Player()
-        self.blocks = []
-        self.powerups = []
-        self.particles = []
+    def reset_game(self, seed=None):
+        """Reset game về trạng thái ban đầu (seed mới ngẫu nhiên nếu không chỉ định)"""
+        self.clock.reset()
+        self.rng = GameRandom(seed)
+        self.seed = self.rng.seed
+        # Hiệu ứng chỉ để nhìn (GHOST_BLOCKS) dùng luồng riêng, không ảnh hưởng mô phỏng
+        self.fx_rng = np.random.default_rng(self.seed)
+        if getattr(self, "players", None) is None:
+            self.players = [Player() for _ in range(self.num_players)]
+        else:
+            for player in self.players:
+                player.reset()
+        self.player = self.players[0]
+        if self.num_players > 1:
+            # Versus: dàn đều người chơi theo bề ngang
+            for i, player in enumerate(self.players):
+                player.x = (i + 1) * WIDTH // (self.num_players + 1) - PLAYER_SIZE // 2
+        self.collision = CollisionIndex()
+        if getattr(self, "blocks", None) is None:
+            self.blocks = BlockStore()
+        else:
+            self.blocks.clear()
+        if getattr(self, "powerups", None) is None:
+            self.powerups = []  # luôn theo thứ tự y giảm dần (xem CollisionIndex.powerup_hits)
+            self.powerup_pool = PowerUpPool()
+        else:
+            self.powerup_pool.release_all(self.powerups)
+            self.powerups.clear()
+        if getattr(self, "particles", None) is None:
+            self.particles = ParticlePool()
+        else:
+            self.particles.clear()
         
         # Game stats
         self.score = 0
@@ -283,339 +1355,533 @@ class GameManager:
         self.block_size = BLOCK_SIZE
         self.score_multiplier = 1
         
-        # Timing
-        self.last_block_spawn = 0
-        self.last_powerup_spawn = 0
-        self.last_event_time = 0
-        self.next_event_time = time.time() + random.randint(8, 15)
+        # Timing (tính bằng tick): spawn, burst, hết hạn event/power-up đều nằm
+        # trong một hàng đợi hẹn giờ
+        if getattr(self, "timers", None) is None:
+            self.timers = TimerQueue()
+        else:
+            self.timers.clear()
+        self.timers.schedule(1, "block_spawn")
+        if self.rules.powerups:
+            self.timers.schedule(1, "powerup_spawn")
+        self.next_event_time = self.clock.ticks(self.rng.randint(8, 15))
         
         # Events
         self.active_events = {}
         self.event_end_times = {}
+        self.event_mask = 0  # OR các bit của event đang active
+        self.frame_hooks = []
         self.warning_text = ""
         self.warning_timer = 0
         
         # Visual effects
-        self.bg_color = BLACK
+        self.bg_color = self.rules.bg_color
+        self.drawn_bg_color = self.bg_color
+        self.last_presented_bg_color = None
         self.earthquake_offset = (0, 0)
         self.laser_y = -100  # Vị trí laser beam
         
         # Game state
         self.game_over = False
+        self.death_cause = None
+        self.events_triggered = []  # tên các event đã kích hoạt trong ván, theo thứ tự
         self.paused = False
+        self.telemetry.emit("game_start", 0, seed=self.seed, rules=self.rules.name,
+                            players=self.num_players, arena=[WIDTH, HEIGHT])
     
     def spawn_block(self):
         """Tạo khối mới"""
-        x = random.randint(0, WIDTH - self.block_size)
-        block = Block(x, -self.block_size, self.block_size, self.block_speed)
-        self.blocks.append(block)
+        x = self.rng.randint(0, WIDTH - self.block_size)
+        self.blocks.add(x, -self.block_size, self.block_size, self.block_speed,
+                        self.clock.tick)
+    
+    def spawn_blocks(self, count):
+        """Tạo count khối cùng lúc (một lần sinh số ngẫu nhiên cho cả lô)"""
+        xs = self.rng.gen.integers(0, WIDTH - self.block_size + 1, count)
+        self.blocks.add_many(xs, -self.block_size, self.block_size, self.block_speed,
+                             self.clock.tick)
     
     def spawn_powerup(self):
         """Tạo power-up mới"""
-        x = random.randint(0, WIDTH - POWERUP_SIZE)
-        power_type = random.choice(["shield", "speed", "score"])
-        powerup = PowerUp(x, -POWERUP_SIZE, power_type)
-        self.powerups.append(powerup)
-    
-    def trigger_event(self):
-        """Kích hoạt sự kiện đặc biệt ngẫu nhiên"""
-        # Danh sách tất cả 18 events
-        events = [
-            "BIG_BLOCKS", "TINY_BLOCKS", "FAST_BLOCKS", "SLOW_MOTION",
-            "MIRROR_MODE", "BLOCK_RAIN", "GHOST_BLOCKS", "COLOR_CHANGE",
-            "GRAVITY_FLIP", "MAGNET_PULL", "INVISIBLE_PLAYER", "DOUBLE_SCORE",
-            "FREEZE_BLOCKS", "SPIRAL_BLOCKS", "EARTHQUAKE", "LASER_BEAM",
-            "SHIELD_RAIN", "TELEPORT_BLOCKS"
-        ]
-        
-        event = random.choice(events)
-        current_time = time.time()
+        x = self.rng.randint(0, WIDTH - POWERUP_SIZE)
+        power_type = self.rng.choice(["shield", "speed", "score"])
+        self.powerups.append(self.powerup_pool.acquire(x, -POWERUP_SIZE, power_type))
+    
+    def spawn_shield(self):
+        """Tạo power-up shield (dùng cho SHIELD_RAIN)"""
+        x = self.rng.randint(0, WIDTH - POWERUP_SIZE)
+        self.powerups.append(self.powerup_pool.acquire(x, -POWERUP_SIZE, "shield"))
+    
+    def remove_powerups(self, collected):
+        """Xóa power-up đã thu thập (chỉ số trong collected) hoặc đã rơi khỏi màn hình
+
+        Dồn tại chỗ trong một lượt (giữ thứ tự y) và trả các power-up bị xóa về pool.
+        """
+        powerups = self.powerups
+        pool = self.powerup_pool
+        collected = set(collected)
+        kept = 0
+        for i, powerup in enumerate(powerups):
+            if i in collected or powerup.y > HEIGHT:
+                pool.release(powerup)
+            else:
+                powerups[kept] = powerup
+                kept += 1
+        del powerups[kept:]
+    
+    def schedule_spawns(self, kind, count, interval):
+        """Lên lịch tạo count vật thể, cách nhau interval giây theo đồng hồ game"""
+        start = self.clock.tick
+        for i in range(count):
+            self.timers.schedule(start + self.clock.ticks(i * interval), "burst", kind)
+    
+    def trigger_event(self, event=None):
+        """Kích hoạt sự kiện đặc biệt (ngẫu nhiên nếu không chỉ định)"""
+        if event is None:
+            event = self.rng.choice(self.events.names)
+        spec = self.events.get(event)
+        tick = self.clock.tick
         
         # Đặt thời gian kết thúc event (6 giây)
-        self.active_events[event] = current_time
-        self.event_end_times[event] = current_time + 6
+        self.active_events[event] = tick
+        self.event_end_times[event] = tick + self.clock.ticks(6)
+        self.timers.schedule(first_tick_after(self.event_end_times[event]), "event_end", event)
+        self.event_mask |= spec.flag
+        self.events_triggered.append(event)
+        if spec.on_frame is not None:
+            self.frame_hooks.append(spec.on_frame)
+        
+        self.telemetry.emit("event_start", tick, event=event, score=self.score, level=self.level)
         
         # Hiển thị warning
-        self.warning_text = event.replace("_", " ")
-        self.warning_timer = current_time
+        self.warning_text = spec.label
+        self.warning_timer = tick
         
         # Đặt thời gian cho event tiếp theo
-        self.next_event_time = current_time + random.randint(10, 20)
+        self.next_event_time = tick + self.clock.ticks(self.rng.randint(10, 20))
         
         # Xử lý logic riêng cho từng event
-        if event == "BIG_BLOCKS":
-            self.block_size = int(BLOCK_SIZE * 1.8)
-        elif event == "TINY_BLOCKS":
-            self.block_size = int(BLOCK_SIZE * 0.6)
-        elif event == "FAST_BLOCKS":
-            self.block_speed += 3
-            self.score_multiplier = 3
-        elif event == "SLOW_MOTION":
-            self.block_speed = max(1, int(self.block_speed * 0.3))
-            self.player.speed = int(INIT_PLAYER_SPEED * 0.5)
-        elif event == "COLOR_CHANGE":
-            # Đổi màu nền ngẫu nhiên
-            colors = [BLUE, GREEN, PURPLE, ORANGE, PINK]
-            self.bg_color = random.choice(colors)
-        elif event == "BLOCK_RAIN":
-            # Tạo nhiều khối cùng lúc
-            for i in range(12):
-                pygame.time.set_timer(pygame.USEREVENT + 2, i * 80)
-        elif event == "INVISIBLE_PLAYER":
-            self.player.invisible = True
-        elif event == "DOUBLE_SCORE":
-            self.score_multiplier = 4
-        elif event == "FREEZE_BLOCKS":
-            self.block_speed = 0
-        elif event == "LASER_BEAM":
-            self.laser_y = HEIGHT * 0.7  # Laser ở 70% chiều cao màn hình
-        elif event == "SHIELD_RAIN":
-            # Tạo nhiều shield power-ups
-            for i in range(3):
-                pygame.time.set_timer(pygame.USEREVENT + 3, i * 500)
+        if spec.on_start is not None:
+            spec.on_start(self)
     
     def end_event(self, event):
         """Kết thúc một event và trả về trạng thái bình thường"""
-        if event == "BIG_BLOCKS" or event == "TINY_BLOCKS":
-            self.block_size = BLOCK_SIZE
-        elif event == "FAST_BLOCKS":
-            self.block_speed = INIT_BLOCK_SPEED + self.level
-            self.score_multiplier = 1
-        elif event == "SLOW_MOTION":
-            self.block_speed = INIT_BLOCK_SPEED + self.level
-            self.player.speed = INIT_PLAYER_SPEED
-        elif event == "COLOR_CHANGE":
-            self.bg_color = BLACK
-        elif event == "GRAVITY_FLIP":
-            self.block_speed = abs(self.block_speed)
-        elif event == "INVISIBLE_PLAYER":
-            self.player.invisible = False
-        elif event == "DOUBLE_SCORE":
-            self.score_multiplier = 1
-        elif event == "FREEZE_BLOCKS":
-            self.block_speed = INIT_BLOCK_SPEED + self.level
-        elif event == "LASER_BEAM":
-            self.laser_y = -100
+        spec = self.events.get(event)
+        self.event_mask &= ~spec.flag
+        if spec.on_frame is not None:
+            self.frame_hooks.remove(spec.on_frame)
+        if spec.on_end is not None:
+            spec.on_end(self)
         
         # Thưởng điểm khi sống sót qua event
-        self.score += 15
+        self.score += self.rules.event_bonus
+        tick = self.clock.tick
+        self.telemetry.emit("event_end", tick, event=event, score=self.score,
+                            duration_ticks=tick - self.active_events.get(event, tick))
     
-    def update(self, keys):
-        """Cập nhật toàn bộ game logic"""
+    def update(self, keys=None):
+        """Cập nhật toàn bộ game logic
+
+        keys: trạng thái phím của frame này; nếu None thì đọc từ input_source.
+        """
         if self.game_over or self.paused:
             return
-            
-        current_time = time.time()
+        
+        self.clock.advance()
+        if keys is None:
+            keys = self.input_source.get_keys(self)
+        self._step((keys,))
+    
+    def update_players(self, keys):
+        """Versus: chạy một frame, keys[i] là trạng thái phím của người chơi i"""
+        if self.game_over or self.paused:
+            return
+        
+        self.clock.advance()
+        self._step(keys)
+    
+    def _step(self, keys):
+        """Phần chung của update()/update_players() sau khi clock đã tiến một tick"""
+        tick = self.clock.tick
+        players = self.players
         
         # Cập nhật player
-        mirror_mode = "MIRROR_MODE" in self.active_events
-        self.player.update(keys, mirror_mode)
-        
-        # Kiểm tra và kết thúc events
-        events_to_remove = []
-        for event, end_time in self.event_end_times.items():
-            if current_time > end_time:
-                events_to_remove.append(event)
-                self.end_event(event)
-        
-        for event in events_to_remove:
-            del self.active_events[event]
-            del self.event_end_times[event]
-        
-        # Spawn blocks
-        if current_time * 1000 - self.last_block_spawn > max(1000 - self.level * 50, 300):
-            self.spawn_block()
-            self.last_block_spawn = current_time * 1000
-        
-        # Spawn power-ups
-        if current_time * 1000 - self.last_powerup_spawn > 8000 + random.randint(0, 7000):
-            self.spawn_powerup()
-            self.last_powerup_spawn = current_time * 1000
+        mirror_mode = bool(self.event_mask & EV_MIRROR_MODE)
+        for player, player_keys in zip(players, keys):
+            if player.alive:
+                player.update(player_keys, mirror_mode)
+        profiler = self.profiler
+        profiler.mark("player")
+        
+        # Chạy các hẹn giờ đến hạn: hết shield/speed boost, kết thúc event,
+        # BLOCK_RAIN/SHIELD_RAIN và spawn định kỳ
+        for kind, arg in self.timers.pop_due(tick):
+            self.run_timer(kind, arg, tick)
         
         # Trigger events
-        if (self.score >= 50 and current_time > self.next_event_time and 
+        if (self.score >= self.rules.event_threshold and tick > self.next_event_time and 
             len(self.active_events) == 0):
             self.trigger_event()
+        profiler.mark("spawn")
         
-        # Cập nhật blocks
-        blocks_to_remove = []
-        for i, block in enumerate(self.blocks):
-            block.update(self.active_events, self.player.x)
-            
-            # Kiểm tra va chạm
-            if block.get_rect().colliderect(self.player.get_rect()):
-                if not self.player.shield_active:
-                    self.game_over = True
-                    save_high_score(self.score)
-                    return
-            
-            # Xóa blocks ra khỏi màn hình
-            if "GRAVITY_FLIP" in self.active_events:
-                if block.y < -block.height:
-                    blocks_to_remove.append(i)
-                    self.score += self.score_multiplier
-            else:
-                if block.y > HEIGHT:
-                    blocks_to_remove.append(i)
-                    self.score += self.score_multiplier
+        # Cập nhật blocks (toàn bộ khối trong một lần xử lý theo lô);
+        # MAGNET_PULL hút về người chơi đầu tiên còn sống
+        target = self.player if self.player.alive else next(p for p in players if p.alive)
+        self.blocks.update(self.event_mask, target.x, tick, self.rng)
+        
+        # Kiểm tra va chạm (broad-phase theo dải của người chơi, rồi kiểm tra chính xác).
+        # Shield nhặt trong frame này chỉ có tác dụng từ frame sau (kể cả với laser).
+        collision = self.collision
+        exposed = [] if self.rules.invulnerable else [
+            p for p in players if p.alive and not p.shield_active]
+        for player in exposed:
+            collision.set_target(player.get_rect())
+            if collision.hits_blocks(self.blocks):
+                self.kill_player(player, "block")
+        if self.game_over:
+            return
         
-        # Xóa blocks (từ cuối lên để không ảnh hưởng index)
-        for i in reversed(blocks_to_remove):
-            del self.blocks[i]
+        # Xóa blocks ra khỏi màn hình và cộng điểm
+        removed = self.blocks.remove_offscreen(self.event_mask & EV_GRAVITY_FLIP)
+        self.score += removed * self.score_multiplier
+        profiler.mark("blocks")
         
         # Cập nhật power-ups
-        powerups_to_remove = []
-        for i, powerup in enumerate(self.powerups):
+        for powerup in self.powerups:
             powerup.update()
-            
-            # Kiểm tra thu thập
-            if powerup.get_rect().colliderect(self.player.get_rect()):
-                powerups_to_remove.append(i)
-                
-                # Tạo particle effect
-                for _ in range(8):
-                    particle = Particle(powerup.x + powerup.width//2, 
-                                       powerup.y + powerup.height//2, 
-                                       powerup.color)
-                    self.particles.append(particle)
-                
-                # Áp dụng hiệu ứng power-up
-                if powerup.type == "shield":
-                    self.player.shield_active = True
-                    self.player.shield_timer = current_time * 1000 + 5000
-                elif powerup.type == "speed":
-                    self.player.speed_boost_active = True
-                    self.player.speed_boost_timer = current_time * 1000 + 5000
-                    self.player.speed = int(INIT_PLAYER_SPEED * 1.5)
-                elif powerup.type == "score":
-                    self.score += 50
-            
-            # Xóa power-ups ra khỏi màn hình
-            elif powerup.y > HEIGHT:
-                powerups_to_remove.append(i)
         
-        # Xóa power-ups
-        for i in reversed(powerups_to_remove):
-            del self.powerups[i]
+        # Kiểm tra thu thập (chỉ power-up nằm trong dải của người chơi);
+        # versus: hai người cùng chạm thì người có chỉ số nhỏ hơn nhận
+        collected = []
+        for player in players:
+            if not player.alive:
+                continue
+            collision.set_target(player.get_rect())
+            for i in collision.powerup_hits(self.powerups):
+                if i not in collected:
+                    collected.append(i)
+                    self.collect_powerup(self.powerups[i], tick, player)
         
-        # Cập nhật particles
-        particles_to_remove = []
-        for i, particle in enumerate(self.particles):
-            particle.update()
-            if particle.life <= 0:
-                particles_to_remove.append(i)
+        # Xóa power-ups đã thu thập hoặc ra khỏi màn hình
+        if collected or (self.powerups and self.powerups[0].y > HEIGHT):
+            self.remove_powerups(collected)
         
-        for i in reversed(particles_to_remove):
-            del self.particles[i]
+        # Cập nhật particles
+        self.particles.update()
+        profiler.mark("powerups")
         
         # Kiểm tra laser beam collision
-        if "LASER_BEAM" in self.active_events:
-            player_rect = self.player.get_rect()
-            if (player_rect.bottom > self.laser_y - 5 and 
-                player_rect.top < self.laser_y + 5 and 
-                not self.player.shield_active):
-                self.game_over = True
-                save_high_score(self.score)
+        if self.event_mask & EV_LASER_BEAM:
+            for player in exposed:
+                collision.set_target(player.get_rect())
+                if player.alive and collision.hits_laser(self.laser_y):
+                    self.kill_player(player, "laser")
+            if self.game_over:
                 return
         
         # Cập nhật level
         new_level = self.score // 100 + 1
-        if new_level > self.level:
+        if self.rules.levels and new_level > self.level:
             self.level = new_level
             self.block_speed = INIT_BLOCK_SPEED + self.level
+            self.telemetry.emit("level_up", tick, level=new_level, score=self.score)
         
-        # Earthquake effect
-        if "EARTHQUAKE" in self.active_events:
-            self.earthquake_offset = (random.randint(-5, 5), random.randint(-5, 5))
-        else:
-            self.earthquake_offset = (0, 0)
+        # Hiệu ứng chạy mỗi frame của các event đang active (ví dụ EARTHQUAKE)
+        for hook in self.frame_hooks:
+            hook(self)
+        profiler.mark("effects")
     
-    def draw(self, screen):
-        """Vẽ toàn bộ game lên màn hình"""
+    def run_timer(self, kind, arg, tick):
+        """Xử lý một hẹn giờ đã đến hạn"""
+        if kind == "shield_end":
+            # Shield nhặt sau có thể đã gia hạn: shield_timer là mốc thật
+            player = self.players[arg]
+            if player.shield_active and tick > player.shield_timer:
+                player.shield_active = False
+        elif kind == "boost_end":
+            player = self.players[arg]
+            if player.speed_boost_active and tick > player.speed_boost_timer:
+                player.speed_boost_active = False
+                player.speed = INIT_PLAYER_SPEED
+        elif kind == "event_end":
+            if arg in self.event_end_times and tick > self.event_end_times[arg]:
+                self.end_event(arg)
+                del self.active_events[arg]
+                del self.event_end_times[arg]
+        elif kind == "burst":
+            if arg == "block":
+                self.spawn_block()
+            else:
+                self.spawn_shield()
+        elif kind == "block_spawn":
+            count = self.rules.spawn_count(WIDTH)
+            if count == 1:
+                self.spawn_block()
+            else:
+                self.spawn_blocks(count)
+            interval = self.clock.ticks(self.rules.block_spawn_interval(self.level) / 1000)
+            self.timers.schedule(tick + first_tick_after(interval), "block_spawn")
+        elif kind == "powerup_spawn":
+            self.spawn_powerup()
+            self.timers.schedule(tick + self.powerup_spawn_delay(), "powerup_spawn")
+    
+    def powerup_spawn_delay(self):
+        """Số tick tới lần spawn power-up kế tiếp
+
+        Luật gốc tung lại ngưỡng mỗi frame: spawn khi thời gian từ lần trước
+        > 8000 + randint(0, 7000) ms. Các lần tung đó được chạy trước ở đây
+        (chỉ từ giây thứ 8), nên khoảng cách vẫn phân bố như bản gốc (~8-9 giây).
+        """
+        ms_per_tick = 1000 / self.clock.fps
+        delay = first_tick_after(self.clock.ticks(8))
+        while delay * ms_per_tick <= 8000 + self.rng.randint(0, 7000):
+            delay += 1
+        return delay
+    
+    def collect_powerup(self, powerup, tick, player=None):
+        """Áp dụng hiệu ứng khi người chơi (mặc định người chơi 0) thu thập power-up"""
+        if player is None:
+            player = self.player
+        index = self.players.index(player)
+        self.telemetry.emit("powerup", tick, powerup=powerup.type, player=index, score=self.score)
+        # Tạo particle effect
+        self.particles.emit(powerup.x + powerup.width//2, 
+                            powerup.y + powerup.height//2, 
+                            powerup.color, 8, self.rng)
+        
+        # Áp dụng hiệu ứng power-up
+        if powerup.type == "shield":
+            player.shield_active = True
+            player.shield_timer = tick + self.clock.ticks(5)
+            self.timers.schedule(first_tick_after(player.shield_timer), "shield_end", index)
+        elif powerup.type == "speed":
+            player.speed_boost_active = True
+            player.speed_boost_timer = tick + self.clock.ticks(5)
+            self.timers.schedule(first_tick_after(player.speed_boost_timer), "boost_end", index)
+            player.speed = int(INIT_PLAYER_SPEED * 1.5)
+        elif powerup.type == "score":
+            self.score += 50
+    
+    def update_from_mask(self, mask):
+        """Chạy một frame với input dạng bitmask (INPUT_*), kể cả trạng thái pause"""
+        self.paused = bool(mask & INPUT_PAUSE)
+        self.update(KeyState.from_mask(mask))
+    
+    def snapshot(self):
+        """Chụp trạng thái hiện tại (GameSnapshot) cho bot nhìn trước hoặc phân tích "nếu như" """
+        return GameSnapshot(self)
+    
+    def restore(self, snap):
+        """Đưa game về đúng trạng thái của snap, dùng lại bộ nhớ đã cấp phát
+
+        Bot nhìn trước nên restore() cùng một GameManager nháp cho mỗi nhánh
+        thay vì fork() mỗi lần: restore không cấp phát gì thêm.
+        """
+        self.rules = snap.rules
+        self.events = snap.rules.events
+        self.clock.tick = snap.tick
+        for name, value in zip(SNAPSHOT_FIELDS, snap.fields):
+            setattr(self, name, value)
+        self.rng.seed = self.seed
+        self.rng.setstate(snap.rng)
+        self.fx_rng.bit_generator.state = snap.fx_rng
+        for player, state in zip(self.players, snap.players):
+            player.restore(state)
+        self.blocks.restore(snap.blocks)
+        self.powerup_pool.release_all(self.powerups)
+        self.powerups.clear()
+        acquire = self.powerup_pool.acquire
+        self.powerups.extend([acquire(x, y, power_type) for x, y, power_type in snap.powerups])
+        self.particles.restore(snap.particles)
+        self.timers.restore(snap.timers)
+        self.active_events = dict(snap.active_events)
+        self.event_end_times = dict(snap.event_end_times)
+        self.frame_hooks = list(snap.frame_hooks)
+        self.events_triggered = list(snap.events_triggered)
+    
+    def fork(self):
+        """GameManager độc lập có cùng trạng thái
+
+        Bản fork dùng chung input_source và không lưu điểm (scores=None).
+        """
+        game = GameManager.__new__(GameManager)
+        game.clock = SimulationClock(self.clock.fps)
+        game.input_source = self.input_source
+        game.scores = None
+        game.profiler = NULL_PROFILER
+        game.telemetry = NULL_TELEMETRY
+        game.rng = self.rng.copy()
+        game.fx_rng = np.random.default_rng(self.seed)
+        game.num_players = self.num_players
+        game.players = [Player() for _ in self.players]
+        game.player = game.players[0]
+        game.collision = CollisionIndex()
+        game.blocks = BlockStore(max(64, len(self.blocks)))
+        game.powerups = []
+        game.powerup_pool = PowerUpPool()
+        game.particles = ParticlePool(self.particles.capacity)
+        game.timers = TimerQueue()
+        game.drawn_bg_color = self.drawn_bg_color
+        game.last_presented_bg_color = None
+        game.restore(self.snapshot())
+        return game
+    
+    def kill_player(self, player, cause):
+        """Loại một người chơi; hết người chơi còn sống thì kết thúc ván"""
+        player.alive = False
+        # Kèm các event đang active để biết tổ hợp nào gây chết nhiều nhất
+        self.telemetry.emit("death", self.clock.tick, player=self.players.index(player),
+                            cause=cause, active_events=list(self.active_events),
+                            score=self.score, level=self.level)
+        if not any(p.alive for p in self.players):
+            self.end_game(cause)
+    
+    def end_game(self, cause):
+        """Kết thúc game (cause: thứ gây chết, ví dụ "block" hoặc "laser") và lưu điểm cao"""
+        self.game_over = True
+        self.death_cause = cause
+        self.telemetry.emit("game_end", self.clock.tick, score=self.score, level=self.level,
+                            duration_s=self.clock.now(), cause=cause,
+                            events=list(self.events_triggered))
+        if self.scores is not None:
+            # Chỉ đưa vào hàng đợi; ghi đĩa chạy ở thread nền nên không khựng frame
+            self.scores.record(self.score, self.level, self.clock.now(), self.seed, cause)
+    
+    def draw(self, screen, dirty=None, interpolator=None, alpha=1.0):
+        """Vẽ toàn bộ game lên màn hình
+
+        dirty: nếu là list, các vùng vừa vẽ được thêm vào (cho DirtyRectRenderer).
+        interpolator/alpha: vẽ khối, power-up và người chơi ở vị trí giữa tick
+        trước và tick hiện tại (alpha = 0..1), khi vẽ nhanh hơn nhịp mô phỏng.
+        """
+        view = interpolator.view(self, alpha) if interpolator is not None else None
+        if view is None:
+            block_positions, player_xs, powerup_dy = None, [None] * len(self.players), 0
+        else:
+            block_positions, player_xs, powerup_dy = view
         # Xóa màn hình với màu nền
         screen.fill(self.bg_color)
+        self.drawn_bg_color = self.bg_color
         
         # Vẽ laser beam
-        if "LASER_BEAM" in self.active_events:
-            pygame.draw.rect(screen, RED, (0, self.laser_y - 5, WIDTH, 10))
-        
-        # Vẽ tất cả game objects
-        for block in self.blocks:
-            block.draw(screen, self.active_events, self.earthquake_offset)
-        
-        for powerup in self.powerups:
-            powerup.draw(screen)
+        if self.event_mask & EV_LASER_BEAM:
+            laser_rect = pygame.draw.rect(screen, RED, (0, self.laser_y - 5, WIDTH, 10))
+            if dirty is not None:
+                dirty.append(laser_rect)
         
-        for particle in self.particles:
-            particle.draw(screen)
-        
-        self.player.draw(screen, self.earthquake_offset)
+        # Vẽ tất cả game objects bằng một lần blits() từ các sprite đã cache
+        batch = []
+        self.blocks.sprites(batch, self.event_mask, self.earthquake_offset, self.fx_rng,
+                            self.rules.ghost_alpha, block_positions)
+        batch.extend([(powerup.sprite(), (powerup.x, powerup.y - powerup_dy))
+                      for powerup in self.powerups])
+        self.particles.sprites(batch)
+        for player, x in zip(self.players, player_xs):
+            # Versus: người bị loại chỉ hiện lại khi hết ván
+            if player.alive or self.game_over:
+                player.sprites(batch, self.earthquake_offset, x)
+        screen.blits(batch, doreturn=False)
+
+        if dirty is not None:
+            dirty.extend(self.blocks.rects(self.earthquake_offset, block_positions))
+            # Khi nội suy, vùng vẽ nằm giữa vị trí tick trước và tick này
+            reach = math.ceil(powerup_dy)
+            dirty.extend(powerup.get_rect().inflate(0, 2 * reach) for powerup in self.powerups)
+            particle_rect = self.particles.bounding_rect()
+            if particle_rect is not None:
+                dirty.append(particle_rect)
+            # Mở rộng để bao cả vòng shield
+            for player, x in zip(self.players, player_xs):
+                rect = player.get_rect()
+                if x is not None:
+                    rect.x = int(x)
+                dirty.append(rect.move(self.earthquake_offset).inflate(24, 24))
+        self.profiler.mark("draw")
         
         # Vẽ UI
-        self.draw_ui(screen)
+        self.draw_ui(screen, dirty)
+        self.profiler.mark("ui")
+    
+    def needs_full_redraw(self):
+        """Toàn màn hình thay đổi (rung, đổi màu nền) nên phải flip cả frame"""
+        bg_changed = self.drawn_bg_color != self.last_presented_bg_color
+        self.last_presented_bg_color = self.drawn_bg_color
+        return bool(self.event_mask & (EV_EARTHQUAKE | EV_COLOR_CHANGE)) or bg_changed
     
-    def draw_ui(self, screen):
+    def draw_ui(self, screen, dirty=None):
         """Vẽ giao diện người dùng"""
+        rects = dirty if dirty is not None else []
+        
         # Score và Level
-        score_text = font_medium.render(f"Score: {self.score}", True, WHITE)
-        level_text = font_medium.render(f"Level: {self.level}", True, WHITE)
-        screen.blit(score_text, (10, 10))
-        screen.blit(level_text, (10, 40))
+        text_color = self.rules.text_color
+        score_text = render_text(get_font(FONT_MEDIUM), f"Score: {self.score}", text_color)
+        rects.append(screen.blit(score_text, (10, 10)))
+        if self.rules.detailed_hud:
+            level_text = render_text(get_font(FONT_MEDIUM), f"Level: {self.level}", text_color)
+            rects.append(screen.blit(level_text, (10, 40)))
+            self.draw_status(screen, rects)
         
+        # Warning text
+        if self.warning_text and self.clock.tick - self.warning_timer < self.clock.ticks(2):
+            warning_surface = render_text(get_font(FONT_LARGE), f"⚠️ {self.warning_text}", RED)
+            warning_rect = warning_surface.get_rect(center=(WIDTH//2, HEIGHT//2))
+            rects.append(screen.blit(warning_surface, warning_rect))
+        
+        # Pause text
+        if self.paused:
+            pause_surface = render_text(get_font(FONT_LARGE), "PAUSED", WHITE)
+            pause_rect = pause_surface.get_rect(center=(WIDTH//2, HEIGHT//2))
+            rects.append(pygame.draw.rect(screen, BLACK, pause_rect.inflate(20, 20)))
+            screen.blit(pause_surface, pause_rect)
+    
+    def draw_status(self, screen, rects):
+        """Danh sách event đang active và trạng thái power-up của người chơi"""
         # Active events
         y_offset = 70
         for event in self.active_events:
-            event_text = font_small.render(f"⚡ {event.replace('_', ' ')}", True, YELLOW)
-            screen.blit(event_text, (10, y_offset))
+            event_text = render_text(get_font(FONT_SMALL), f"⚡ {self.events.get(event).label}", YELLOW)
+            rects.append(screen.blit(event_text, (10, y_offset)))
             y_offset += 20
         
         # Player status
         if self.player.shield_active:
-            shield_text = font_small.render("🛡️ Shield Active", True, CYAN)
-            screen.blit(shield_text, (10, y_offset))
+            shield_text = render_text(get_font(FONT_SMALL), "🛡️ Shield Active", CYAN)
+            rects.append(screen.blit(shield_text, (10, y_offset)))
             y_offset += 20
         
         if self.player.speed_boost_active:
-            speed_text = font_small.render("⚡ Speed Boost", True, PURPLE)
-            screen.blit(speed_text, (10, y_offset))
+            speed_text = render_text(get_font(FONT_SMALL), "⚡ Speed Boost", PURPLE)
+            rects.append(screen.blit(speed_text, (10, y_offset)))
             y_offset += 20
-        
-        # Warning text
-        if self.warning_text and time.time() - self.warning_timer < 2:
-            warning_surface = font_large.render(f"⚠️ {self.warning_text}", True, RED)
-            warning_rect = warning_surface.get_rect(center=(WIDTH//2, HEIGHT//2))
-            screen.blit(warning_surface, warning_rect)
-        
-        # Pause text
-        if self.paused:
-            pause_surface = font_large.render("PAUSED", True, WHITE)
-            pause_rect = pause_surface.get_rect(center=(WIDTH//2, HEIGHT//2))
-            pygame.draw.rect(screen, BLACK, pause_rect.inflate(20, 20))
-            screen.blit(pause_surface, pause_rect)
 
 def draw_text_center(screen, text, font, color, y):
     """Hàm tiện ích để vẽ text ở giữa màn hình"""
-    text_surface = font.render(text, True, color)
+    text_surface = render_text(font, text, color)
     text_rect = text_surface.get_rect(center=(WIDTH // 2, y))
-    screen.blit(text_surface, text_rect)
+    return screen.blit(text_surface, text_rect)
 
-def show_menu(screen):
-    """Hiển thị menu chính"""
+def show_menu(screen, scores, rules=ENHANCED_RULES):
+    """Hiển thị menu chính với bảng xếp hạng (đọc từ bộ nhớ của ScoreStore)"""
     screen.fill(BLACK)
     
     # Title
-    draw_text_center(screen, "🚧 DODGE BLOCKS", font_large, WHITE, HEIGHT//2 - 100)
-    draw_text_center(screen, "Enhanced Edition", font_medium, YELLOW, HEIGHT//2 - 60)
+    draw_text_center(screen, "🚧 DODGE BLOCKS", get_font(FONT_LARGE), WHITE, HEIGHT//2 - 100)
+    draw_text_center(screen, rules.title, get_font(FONT_MEDIUM), YELLOW, HEIGHT//2 - 60)
     
     # High score
-    draw_text_center(screen, f"High Score: {HIGH_SCORE}", font_medium, GREEN, HEIGHT//2 - 20)
+    draw_text_center(screen, f"High Score: {scores.high_score}", get_font(FONT_MEDIUM), GREEN, HEIGHT//2 - 20)
     
     # Instructions
-    draw_text_center(screen, "Press SPACE to Start", font_medium, WHITE, HEIGHT//2 + 20)
-    draw_text_center(screen, "Press I for Instructions", font_small, WHITE, HEIGHT//2 + 50)
-    draw_text_center(screen, "Use ← → or A/D to move", font_small, WHITE, HEIGHT//2 + 80)
+    draw_text_center(screen, "Press SPACE to Start", get_font(FONT_MEDIUM), WHITE, HEIGHT//2 + 20)
+    draw_text_center(screen, "Press I for Instructions", get_font(FONT_SMALL), WHITE, HEIGHT//2 + 50)
+    draw_text_center(screen, "Use ← → or A/D to move", get_font(FONT_SMALL), WHITE, HEIGHT//2 + 80)
     
-    pygame.display.flip()
+    # Top 5
+    y = HEIGHT//2 + 120
+    for rank, run in enumerate(scores.leaderboard[:5], 1):
+        draw_text_center(screen, f"{rank}. {run.score}  (level {run.level})", get_font(FONT_SMALL), YELLOW, y)
+        y += 20
+
 
 def show_instructions(screen):
     """Hiển thị hướng dẫn chi tiết"""
@@ -648,43 +1914,269 @@ def show_instructions(screen):
     y = 50
     for line in instructions:
         if line.startswith("🎮"):
-            draw_text_center(screen, line, font_large, YELLOW, y)
+            draw_text_center(screen, line, get_font(FONT_LARGE), YELLOW, y)
         elif line == "":
             pass  # Skip empty lines
         elif line.endswith(":"):
-            draw_text_center(screen, line, font_medium, GREEN, y)
+            draw_text_center(screen, line, get_font(FONT_MEDIUM), GREEN, y)
         else:
-            draw_text_center(screen, line, font_small, WHITE, y)
+            draw_text_center(screen, line, get_font(FONT_SMALL), WHITE, y)
         y += 25
-    
-    pygame.display.flip()
 
-def show_game_over(screen, final_score):
+
+def show_game_over(screen, final_score, scores):
     """Hiển thị màn hình game over"""
     screen.fill(BLACK)
     
     # Game Over text
-    draw_text_center(screen, "GAME OVER", font_large, RED, HEIGHT//2 - 80)
+    draw_text_center(screen, "GAME OVER", get_font(FONT_LARGE), RED, HEIGHT//2 - 80)
     
     # Scores
-    draw_text_center(screen, f"Final Score: {final_score}", font_medium, WHITE, HEIGHT//2 - 40)
-    draw_text_center(screen, f"High Score: {HIGH_SCORE}", font_medium, YELLOW, HEIGHT//2 - 10)
+    draw_text_center(screen, f"Final Score: {final_score}", get_font(FONT_MEDIUM), WHITE, HEIGHT//2 - 40)
+    draw_text_center(screen, f"High Score: {scores.high_score}", get_font(FONT_MEDIUM), YELLOW, HEIGHT//2 - 10)
     
     # New high score notification
-    if final_score == HIGH_SCORE and final_score > 0:
-        draw_text_center(screen, "🎉 NEW HIGH SCORE! 🎉", font_medium, GREEN, HEIGHT//2 + 20)
+    if final_score == scores.high_score and final_score > 0:
+        draw_text_center(screen, "🎉 NEW HIGH SCORE! 🎉", get_font(FONT_MEDIUM), GREEN, HEIGHT//2 + 20)
     
     # Instructions
-    draw_text_center(screen, "Press R to Play Again", font_medium, WHITE, HEIGHT//2 + 60)
-    draw_text_center(screen, "Press ESC for Menu", font_small, WHITE, HEIGHT//2 + 90)
-    
-    pygame.display.flip()
+    draw_text_center(screen, "Press R to Play Again", get_font(FONT_MEDIUM), WHITE, HEIGHT//2 + 60)
+    draw_text_center(screen, "Press ESC for Menu", get_font(FONT_SMALL), WHITE, HEIGHT//2 + 90)
+
+
+# ===== NHỊP MÔ PHỎNG, NỘI SUY VÀ NHỊP VẼ =====
+
+class FixedTimestep:
+    """Tích lũy thời gian thật và cho biết cần chạy bao nhiêu tick mô phỏng
+
+    Mô phỏng luôn chạy đúng tick_rate tick mỗi giây dù màn hình vẽ nhanh hay
+    chậm hơn. Máy quá chậm (tụt quá max_ticks tick trong một frame) thì bỏ
+    phần thời gian dư để không bị cuốn vào vòng chạy bù mãi.
+    """
+    def __init__(self, tick_rate=FPS, max_ticks=5):
+        self.dt = 1 / tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.last = None
+
+    def reset(self):
+        """Bắt đầu đếm lại (vào ván mới, hết pause của cửa sổ...)"""
+        self.accumulator = 0.0
+        self.last = None
+
+    def advance(self):
+        """Số tick cần chạy cho frame này"""
+        now = time.perf_counter()
+        if self.last is None:
+            self.last = now
+            return 1
+        self.accumulator += now - self.last
+        self.last = now
+        ticks = int(self.accumulator / self.dt)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.dt
+        return ticks
+
+    @property
+    def alpha(self):
+        """Vị trí của frame giữa tick vừa chạy và tick kế tiếp (0..1)"""
+        return min(1.0, self.accumulator / self.dt)
+
+class Interpolator:
+    """Nhớ vị trí các vật thể trước tick cuối cùng để vẽ ở giữa hai tick
+
+    capture() được gọi ngay trước update() cuối cùng của mỗi frame. Khối được
+    ghép với vị trí cũ theo id; khối mới spawn hoặc vừa dịch chuyển xa
+    (TELEPORT_BLOCKS) được vẽ ở vị trí hiện tại.
+    """
+    def __init__(self):
+        self.tick = None
+        self.ids = self.x = self.y = None
+        self.player_xs = []
+
+    def capture(self, gm):
+        blocks = gm.blocks
+        self.tick = gm.clock.tick
+        self.ids = blocks.ids.copy()
+        self.x = blocks.x.copy()
+        self.y = blocks.y.copy()
+        self.player_xs = [player.x for player in gm.players]
+
+    def view(self, gm, alpha):
+        """(vị trí khối, x người chơi, độ lùi power-up) tại alpha; None nếu không nội suy được"""
+        if self.tick is None or gm.clock.tick != self.tick + 1 or alpha >= 1.0:
+            return None
+        back = 1.0 - alpha
+        blocks = gm.blocks
+        x, y = blocks.x.copy(), blocks.y.copy()
+        if len(self.ids) and len(x):
+            idx = np.minimum(np.searchsorted(self.ids, blocks.ids), len(self.ids) - 1)
+            known = self.ids[idx] == blocks.ids
+            old_x, old_y = self.x[idx], self.y[idx]
+            known &= np.abs(x - old_x) <= blocks.size
+            x[known] -= (x[known] - old_x[known]) * back
+            y[known] -= (y[known] - old_y[known]) * back
+        player_xs = [player.x - (player.x - old) * back
+                     for player, old in zip(gm.players, self.player_xs)]
+        powerup_dy = POWERUP_SPEED * back
+        return (x, y), player_xs, powerup_dy
+
+class FramePacer:
+    """Giới hạn nhịp vẽ và đo độ lệch (jitter) của từng frame so với mục tiêu
+
+    max_fps = 0: vẽ nhanh nhất có thể. busy_loop: dùng
+    Clock.tick_busy_loop (chính xác hơn, tốn CPU hơn) thay vì Clock.tick.
+    """
+    def __init__(self, max_fps=FPS, busy_loop=False, window=600):
+        self.max_fps = max_fps
+        self.busy_loop = busy_loop
+        self.intervals = deque(maxlen=window)  # ms giữa hai frame liên tiếp
+        self._last = None
+
+    def wait(self):
+        """Chờ tới lúc vẽ frame kế tiếp, ghi lại khoảng cách giữa hai frame"""
+        if self.busy_loop:
+            clock.tick_busy_loop(self.max_fps)
+        else:
+            clock.tick(self.max_fps)
+        now = time.perf_counter()
+        if self._last is not None:
+            self.intervals.append((now - self._last) * 1000)
+        self._last = now
+
+    def report(self):
+        samples = sorted(self.intervals)
+        if not samples:
+            return "Pacing: chưa có frame nào"
+        mean = sum(samples) / len(samples)
+        stdev = math.sqrt(sum((v - mean) ** 2 for v in samples) / len(samples))
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        mode = "tick_busy_loop" if self.busy_loop else "tick"
+        target = f"{1000 / self.max_fps:.2f} ms" if self.max_fps else "không giới hạn"
+        return (f"Pacing ({mode}, mục tiêu {target}, {len(samples)} frame): "
+                f"trung bình {mean:.2f} ms, jitter (độ lệch chuẩn) {stdev:.3f} ms, "
+                f"p99 {p99:.2f} ms, max {samples[-1]:.2f} ms")
+
+# ===== ĐẨY FRAME LÊN MÀN HÌNH =====
+
+class FlipRenderer:
+    """Cách mặc định: mỗi frame flip toàn bộ màn hình"""
+    def invalidate(self):
+        pass
+
+    def present(self, rects, full=False):
+        pygame.display.flip()
+
+class DirtyRectRenderer:
+    """Chỉ đẩy các vùng thay đổi lên màn hình bằng pygame.display.update(rects)
+
+    Mỗi frame cập nhật cả vùng vẽ ở frame trước (để xóa vị trí cũ) lẫn frame này.
+    Quay về flip toàn màn hình khi bị invalidate (đổi state), khi frame yêu cầu
+    (EARTHQUAKE, COLOR_CHANGE) hoặc khi có quá nhiều vùng nhỏ.
+    """
+    def __init__(self, max_rects=64):
+        self.max_rects = max_rects
+        self.prev_rects = []
+        self.force_full = True
+
+    def invalidate(self):
+        """Frame kế tiếp phải flip toàn màn hình"""
+        self.force_full = True
+
+    def present(self, rects, full=False):
+        dirty = self.prev_rects + rects
+        self.prev_rects = rects
+        if full or self.force_full or len(dirty) > self.max_rects:
+            self.force_full = False
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
 
 # ===== MAIN GAME LOOP =====
 
-def main():
-    """Hàm chính của game"""
-    game_manager = GameManager()
+def main(argv=None, rules=ENHANCED_RULES):
+    """Hàm chính của game (rules: luật chơi mặc định, đổi được bằng --rules)"""
+    parser = argparse.ArgumentParser(description=f"Dodge the Blocks - {rules.title}")
+    parser.add_argument("--rules", choices=sorted(RULESETS_BY_NAME), default=rules.name,
+                        help="luật chơi: enhanced (18 event, power-up), classic hoặc stress")
+    parser.add_argument("--arena", type=parse_arena, metavar="WxH",
+                        help="kích thước logic của sân chơi, ví dụ 1920x1080 "
+                             "(cửa sổ co giãn theo màn hình)")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="chỉ cập nhật các vùng thay đổi thay vì flip toàn màn hình")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed cố định cho mọi ván (mặc định: ngẫu nhiên mỗi ván)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="ghi replay của mỗi ván (ván thứ 2 trở đi thêm hậu tố -2, -3...)")
+    parser.add_argument("--replay", metavar="FILE", help="phát lại một file replay")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="tốc độ phát replay (0 = nhanh nhất có thể)")
+    parser.add_argument("--headless", action="store_true",
+                        help="phát replay không mở cửa sổ và in kết quả")
+    parser.add_argument("--profile", action="store_true",
+                        help="đo thời gian từng phase của frame (F3 bật/tắt overlay)")
+    parser.add_argument("--profile-csv", metavar="FILE",
+                        help="ghi thời gian từng phase của mỗi frame ra file CSV")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="in thời gian từng giai đoạn khởi động sau frame đầu tiên")
+    parser.add_argument("--startup-budget", type=float, metavar="MS",
+                        help="ngân sách khởi động (ms); báo OVER BUDGET nếu vượt")
+    parser.add_argument("--exit-after-startup", action="store_true",
+                        help="thoát sau frame đầu tiên (exit code 1 nếu vượt ngân sách)")
+    parser.add_argument("--render-fps", type=int, default=FPS, metavar="N",
+                        help=f"giới hạn số frame vẽ mỗi giây, mô phỏng vẫn chạy {FPS} tick/s "
+                             "(0 = không giới hạn)")
+    parser.add_argument("--busy-loop", action="store_true",
+                        help="giữ nhịp vẽ bằng Clock.tick_busy_loop (chính xác hơn, tốn CPU hơn)")
+    parser.add_argument("--pacing-report", action="store_true",
+                        help="in thống kê jitter của nhịp vẽ khi thoát")
+    parser.add_argument("--telemetry", nargs="?", const=TELEMETRY_DIR, metavar="DIR",
+                        help=f"ghi telemetry của phiên chơi vào DIR (mặc định {TELEMETRY_DIR}/)")
+    args = parser.parse_args(argv)
+    rules = RULESETS_BY_NAME[args.rules]
+    startup = StartupTimer(STARTUP_T0)
+    startup.mark("import")
+    
+    if args.replay:
+        replay = Replay.load(args.replay)
+        set_arena(*replay.arena)
+        screen = None if args.headless else init_display(scaled=replay.arena != DEFAULT_ARENA,
+                                                         title=RULESETS[replay.rules].title)
+        game_manager = play_replay(replay, screen, args.speed)
+        print(f"Replay {args.replay}: seed={replay.seed} frames={len(replay)} "
+              f"score={game_manager.score} level={game_manager.level} "
+              f"game_over={game_manager.game_over}")
+        pygame.quit()
+        return
+    
+    if args.arena:
+        set_arena(*args.arena)
+    screen = init_display(scaled=args.arena is not None, title=rules.title)
+    startup.mark("display")
+    for size in (FONT_SMALL, FONT_MEDIUM, FONT_LARGE):
+        get_font(size)
+    startup.mark("fonts")
+    renderer = DirtyRectRenderer() if args.dirty_rects else FlipRenderer()
+    scores = ScoreStore(ruleset=rules.name)
+    game_manager = GameManager(scores=scores, rules=rules)
+    startup.mark("game")
+    over_budget = False
+    profiler = NULL_PROFILER
+    if args.profile or args.profile_csv:
+        profiler = FrameProfiler(csv_path=args.profile_csv)
+        profiler.overlay_visible = args.profile
+        game_manager.profiler = profiler
+    telemetry = NULL_TELEMETRY
+    if args.telemetry:
+        telemetry = Telemetry(args.telemetry, ruleset=rules.name, arena=[WIDTH, HEIGHT],
+                              render_fps=args.render_fps)
+        game_manager.telemetry = telemetry
+    stepper = FixedTimestep(FPS)
+    interpolator = Interpolator()
+    pacer = FramePacer(args.render_fps, args.busy_loop)
     
     # Game states
     STATE_MENU = 0
@@ -692,22 +2184,42 @@ def main():
     STATE_PLAYING = 2
     STATE_GAME_OVER = 3
     
-    current_state = STATE_MENU
+    last_state = None
     running = True
+    recording = None
+    games_recorded = 0
+    
+    def start_game():
+        """Ván mới (reset engine, không đệ quy) và bắt đầu ghi replay nếu cần"""
+        game_manager.reset_game(args.seed)
+        stepper.reset()
+        if args.record:
+            return Replay(game_manager.seed, FPS, rules=RULESETS.index(rules),
+                          arena=(WIDTH, HEIGHT))
+        return None
     
-    # Event timers
-    pygame.time.set_timer(pygame.USEREVENT + 1, BLOCK_SPAWN_INTERVAL)
+    # Bản cổ điển vào chơi ngay, không qua menu
+    if rules.show_menu:
+        current_state = STATE_MENU
+    else:
+        recording = start_game()
+        current_state = STATE_PLAYING
     
     while running:
+        frame_start = time.perf_counter()
+        profiler.begin_frame()
+        
         # Xử lý events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             
             elif event.type == pygame.KEYDOWN:
-                if current_state == STATE_MENU:
+                if event.key == pygame.K_F3:
+                    profiler.toggle_overlay()
+                elif current_state == STATE_MENU:
                     if event.key == pygame.K_SPACE:
-                        game_manager.reset_game()
+                        recording = start_game()
                         current_state = STATE_PLAYING
                     elif event.key == pygame.K_i:
                         current_state = STATE_INSTRUCTIONS
@@ -724,48 +2236,139 @@ def main():
                 
                 elif current_state == STATE_GAME_OVER:
                     if event.key == pygame.K_r:
-                        game_manager.reset_game()
+                        recording = start_game()
                         current_state = STATE_PLAYING
                     elif event.key == pygame.K_ESCAPE:
                         current_state = STATE_MENU
-            
-            # Custom events cho spawning
-            elif event.type == pygame.USEREVENT + 2:  # Block rain
-                game_manager.spawn_block()
-            elif event.type == pygame.USEREVENT + 3:  # Shield rain
-                x = random.randint(0, WIDTH - POWERUP_SIZE)
-                powerup = PowerUp(x, -POWERUP_SIZE, "shield")
-                game_manager.powerups.append(powerup)
+        
+        # Input của frame dạng bitmask (giống hệt khi phát lại replay)
+        if current_state == STATE_PLAYING:
+            mask = input_mask_from_keys(pygame.key.get_pressed())
+            if game_manager.paused:
+                mask |= INPUT_PAUSE
+        profiler.mark("input")
+        
+        # Rời màn chơi (game over, về menu) thì lưu replay của ván vừa chơi
+        if recording is not None and current_state != STATE_PLAYING:
+            games_recorded += 1
+            recording.save(numbered_path(args.record, games_recorded))
+            recording = None
+        
+        # Đổi màn hình thì phải vẽ lại toàn bộ
+        if current_state != last_state:
+            renderer.invalidate()
+            last_state = current_state
+        profiler.mark("update")
         
         # Game logic dựa trên state
         if current_state == STATE_MENU:
-            show_menu(screen)
+            show_menu(screen, scores, rules)
+            profiler.mark("ui")
+            renderer.present([])
         
         elif current_state == STATE_INSTRUCTIONS:
             show_instructions(screen)
+            profiler.mark("ui")
+            renderer.present([])
         
         elif current_state == STATE_PLAYING:
-            # Lấy input
-            keys = pygame.key.get_pressed()
-            
-            # Cập nhật game
-            game_manager.update(keys)
+            # Mỗi tick mô phỏng ghi một mask, nên replay không phụ thuộc nhịp vẽ
+            ticks = stepper.advance()
+            for i in range(ticks):
+                if recording is not None:
+                    recording.record(mask)
+                if i == ticks - 1:
+                    interpolator.capture(game_manager)
+                game_manager.update_from_mask(mask)
+                if game_manager.game_over:
+                    break
             
             # Kiểm tra game over
             if game_manager.game_over:
                 current_state = STATE_GAME_OVER
+            profiler.mark("update")
             
-            # Vẽ game
-            game_manager.draw(screen)
-            pygame.display.flip()
+            # Vẽ game ở giữa tick trước và tick hiện tại
+            dirty = []
+            game_manager.draw(screen, dirty, interpolator, stepper.alpha)
+            if profiler.overlay_visible:
+                profiler.draw_overlay(screen, get_font(FONT_SMALL))
+                renderer.invalidate()
+            profiler.mark("overlay")
+            renderer.present(dirty, full=game_manager.needs_full_redraw())
+            telemetry.frame_time((time.perf_counter() - frame_start) * 1000)
         
         elif current_state == STATE_GAME_OVER:
-            show_game_over(screen, game_manager.score)
+            show_game_over(screen, game_manager.score, scores)
+            profiler.mark("ui")
+            renderer.present([])
         
-        clock.tick(FPS)
+        if startup is not None:
+            # Frame đầu tiên đã lên màn hình: kết thúc đo khởi động
+            startup.mark("first_frame")
+            over_budget = bool(args.startup_budget) and startup.total() > args.startup_budget
+            if args.startup_report or over_budget:
+                print(startup.report(args.startup_budget))
+            startup = None
+            if args.exit_after_startup:
+                running = False
+        
+        pacer.wait()
+        profiler.mark("present")
+        profiler.end_frame()
+    
+    # Thoát khi đang chơi (đóng cửa sổ, --exit-after-startup): lưu nốt replay
+    if recording is not None:
+        games_recorded += 1
+        recording.save(numbered_path(args.record, games_recorded))
+        recording = None
     
+    if args.pacing_report:
+        print(pacer.report())
+    profiler.close()
+    telemetry.close()
+    scores.close()
     pygame.quit()
+    if args.exit_after_startup and over_budget:
+        return 1
+
+# ===== PHÁT LẠI REPLAY =====
+
+def play_replay(replay, screen=None, speed=1.0):
+    """Phát lại replay qua GameManager.update_from_mask() và trả về GameManager
+
+    screen=None: chạy headless. speed: bội số của FPS, 0 = không giới hạn tốc độ.
+    Sân chơi được đặt theo kích thước đã ghi trong replay.
+    """
+    set_arena(*replay.arena)
+    game_manager = GameManager(seed=replay.seed, rules=RULESETS[replay.rules])
+    for mask in replay.frames:
+        game_manager.update_from_mask(mask)
+        if screen is not None:
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                break
+            game_manager.draw(screen)
+            pygame.display.flip()
+            if speed > 0:
+                clock.tick(FPS * speed)
+        if game_manager.game_over:
+            break
+    return game_manager
+
+# ===== CHẾ ĐỘ HEADLESS =====
+
+def create_headless_game(policy=None, seed=None, rules=None):
+    """Tạo GameManager không cần cửa sổ, nhận input từ policy"""
+    return GameManager(input_source=ScriptedInput(policy), seed=seed, rules=rules)
+
+def run_headless(game_manager, max_frames=None):
+    """Chạy game nhanh nhất có thể tới khi game over hoặc đủ max_frames, trả về số frame đã chạy"""
+    frames = 0
+    while not game_manager.game_over and (max_frames is None or frames < max_frames):
+        game_manager.update()
+        frames += 1
+    return frames
 
 # ===== CHẠY GAME =====
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
\ No newline at end of file
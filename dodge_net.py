@@ -0,0 +1,536 @@
+# Chế độ versus qua mạng cho "Dodge the Blocks"
+# Server asyncio giữ thế giới duy nhất (một GameManager nhiều người chơi) và
+# chạy mô phỏng ở FPS cố định; client chỉ gửi bitmask phím (INPUT_*) và dựng
+# lại thế giới từ các snapshot delta mà server phát mỗi tick.
+#
+#   python dodge_net.py --serve --players 4              # server, chờ đủ 4 người
+#   python dodge_net.py --connect 127.0.0.1:47800        # client có cửa sổ
+#   python dodge_net.py --selftest --players 8 --seconds 5
+#
+# Giao thức (TCP, little-endian, mỗi message có tiền tố độ dài u32):
+#   client -> server: HELLO "DBNT" | version (u8), sau đó INPUT khi phím đổi:
+#                     type (u8) | tick đã thấy (u32) | bitmask (u8)
+#   server -> client: WELCOME: type | id người chơi | số người chơi | seed (u64)
+#                     | luật chơi (u8) | rộng, cao sân (u16, u16) | fps (u16)
+#                     SNAPSHOT mỗi tick: header (tick, điểm, level, event_mask,
+#                     cờ, màu nền) | người chơi | power-up | khối biến mất (id)
+#                     | khối mới (id, x, y, kích thước, tốc độ) | vị trí mọi khối
+#                     (chỉ khi có event bẻ cong quỹ đạo)
+#
+# Khối rơi thẳng có vị trí dạng đóng (xem BlockStore) nên client tự tính y từ
+# lúc spawn; snapshot bình thường chỉ chứa khối mới và khối biến mất, vài chục
+# byte mỗi tick dù trên sân có hàng trăm khối.
+
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import asyncio
+import struct
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import dodge_game_enhanced as game
+
+NET_MAGIC = b"DBNT"
+NET_VERSION = 1
+DEFAULT_PORT = 47800
+
+MSG_WELCOME = 0
+MSG_INPUT = 1
+MSG_SNAPSHOT = 2
+
+FLAG_GAME_OVER = 1
+FLAG_POSITIONS = 2
+
+# Bit trạng thái người chơi trong snapshot
+PLAYER_ALIVE = 1
+PLAYER_SHIELD = 2
+PLAYER_BOOST = 4
+PLAYER_INVISIBLE = 8
+
+POWERUP_TYPES = ("shield", "speed", "score")
+MAX_WRITE_BUFFER = 1 << 20  # client chậm để dồn quá 1 MB sẽ bị ngắt
+MAX_CLIENT_MESSAGE = 1024   # message từ client (hello, input) đều rất nhỏ
+MAX_NET_ARENA = 32767       # tọa độ gửi qua mạng là số nguyên 16 bit có dấu
+INPUT_KEYS = game.INPUT_LEFT | game.INPUT_RIGHT | game.INPUT_A | game.INPUT_D
+
+_LENGTH = struct.Struct("<I")
+_HELLO = struct.Struct("<4sB")
+_WELCOME = struct.Struct("<BBBQBHHH")
+_INPUT = struct.Struct("<BIB")
+_SNAPSHOT = struct.Struct("<BIIHIB3BB")
+_PLAYER = struct.Struct("<hB")
+_POWERUP = struct.Struct("<hhB")
+_COUNT = struct.Struct("<I")
+
+# Bitmask -> KeyState, tạo sẵn cho mọi tổ hợp phím
+_MASK_KEYS = [game.KeyState.from_mask(mask) for mask in range(INPUT_KEYS + 1)]
+
+def frame(payload):
+    """Thêm tiền tố độ dài cho một message"""
+    return _LENGTH.pack(len(payload)) + payload
+
+async def read_message(reader, max_size=None):
+    """Đọc một message; None khi kết nối đã đóng hoặc message dài quá max_size"""
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+        (size,) = _LENGTH.unpack(header)
+        if max_size is not None and size > max_size:
+            return None
+        return await reader.readexactly(size)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+# ===== SNAPSHOT DELTA =====
+
+class SnapshotEncoder:
+    """Mã hóa trạng thái GameManager thành snapshot delta so với tick trước
+
+    Mọi client nhận cùng một chuỗi snapshot từ tick đầu tiên nên server chỉ
+    cần mã hóa một lần mỗi tick rồi gửi cùng một bytes cho tất cả.
+    """
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.uint32)  # các khối client đang có
+        self.next_id = 0  # id nhỏ nhất chưa gửi
+
+    def encode(self, gm):
+        blocks = gm.blocks
+        n = len(blocks)
+        ids = blocks.ids.astype(np.uint32)
+        # Khối mới luôn nằm cuối mảng (thứ tự spawn); khối biến mất là id cũ không còn
+        known = int(np.searchsorted(ids, self.next_id))
+        old = self.ids
+        if known == len(old):
+            gone = old[:0]
+        else:
+            gone = old[~np.isin(old, ids[:known], assume_unique=True)]
+        if n:
+            self.next_id = max(self.next_id, int(ids[-1]) + 1)
+        self.ids = ids
+
+        stepped = bool(gm.event_mask & game.EV_STEPPED_BLOCKS)
+        flags = (FLAG_GAME_OVER if gm.game_over else 0) | (FLAG_POSITIONS if stepped else 0)
+        players = gm.players
+        parts = [_SNAPSHOT.pack(MSG_SNAPSHOT, gm.clock.tick, gm.score, gm.level, gm.event_mask,
+                                flags, *gm.bg_color, len(players))]
+        for player in players:
+            state = ((PLAYER_ALIVE if player.alive else 0) |
+                     (PLAYER_SHIELD if player.shield_active else 0) |
+                     (PLAYER_BOOST if player.speed_boost_active else 0) |
+                     (PLAYER_INVISIBLE if player.invisible else 0))
+            parts.append(_PLAYER.pack(round(player.x), state))
+        parts.append(_COUNT.pack(len(gm.powerups)))
+        for powerup in gm.powerups:
+            parts.append(_POWERUP.pack(round(powerup.x), round(powerup.y),
+                                       POWERUP_TYPES.index(powerup.type)))
+
+        parts.append(_COUNT.pack(len(gone)))
+        parts.append(gone.tobytes())
+
+        x, y = blocks.x, blocks.y
+        parts.append(_COUNT.pack(n - known))
+        if n > known:
+            parts.append(ids[known:].tobytes())
+            parts.append(np.rint(x[known:]).astype("<i2").tobytes())
+            parts.append(np.rint(y[known:]).astype("<i2").tobytes())
+            parts.append(blocks.size[known:].astype("<u2").tobytes())
+            parts.append(blocks.speed[known:].astype("<u2").tobytes())
+        if stepped:
+            parts.append(np.rint(x).astype("<i2").tobytes())
+            parts.append(np.rint(y).astype("<i2").tobytes())
+        return b"".join(parts)
+
+class ClientWorld:
+    """Thế giới phía client, dựng lại từ chuỗi snapshot delta
+
+    Khối lưu (x, y tại ref_tick, tốc độ); y ở tick bất kỳ tính theo dạng đóng
+    y_ref + speed * (tick - ref_tick), giống BlockStore phía server.
+    """
+    def __init__(self, player_id=0, num_players=1, seed=0, rules=0, arena=game.DEFAULT_ARENA):
+        self.player_id = player_id
+        self.num_players = num_players
+        self.seed = seed
+        self.rules = rules
+        self.arena = arena
+        self.tick = 0
+        self.score = 0
+        self.level = 1
+        self.event_mask = 0
+        self.game_over = False
+        self.bg_color = game.BLACK
+        self.players = []    # (x, bit trạng thái)
+        self.powerups = []   # (x, y, loại)
+        self.ids = np.empty(0, dtype=np.uint32)
+        self.x = np.empty(0)
+        self.y_ref = np.empty(0)
+        self.ref_tick = np.empty(0)
+        self.size = np.empty(0)
+        self.speed = np.empty(0)
+
+    @classmethod
+    def from_welcome(cls, payload):
+        _, player_id, num_players, seed, rules, width, height, _fps = _WELCOME.unpack(payload)
+        return cls(player_id, num_players, seed, rules, (width, height))
+
+    def block_y(self, tick=None):
+        """Vị trí y của mọi khối ở tick (mặc định tick của snapshot mới nhất)"""
+        tick = self.tick if tick is None else tick
+        return self.y_ref + self.speed * (tick - self.ref_tick)
+
+    def apply(self, payload):
+        """Áp dụng một snapshot delta"""
+        (_, tick, self.score, self.level, self.event_mask, flags, r, g, b,
+         num_players) = _SNAPSHOT.unpack_from(payload)
+        self.tick = tick
+        self.game_over = bool(flags & FLAG_GAME_OVER)
+        self.bg_color = (r, g, b)
+        offset = _SNAPSHOT.size
+        self.players = [_PLAYER.unpack_from(payload, offset + i * _PLAYER.size)
+                        for i in range(num_players)]
+        offset += num_players * _PLAYER.size
+        (count,) = _COUNT.unpack_from(payload, offset)
+        offset += _COUNT.size
+        self.powerups = [_POWERUP.unpack_from(payload, offset + i * _POWERUP.size)
+                         for i in range(count)]
+        offset += count * _POWERUP.size
+
+        # Khối biến mất
+        (count,) = _COUNT.unpack_from(payload, offset)
+        offset += _COUNT.size
+        if count:
+            gone = np.frombuffer(payload, "<u4", count, offset)
+            keep = ~np.isin(self.ids, gone, assume_unique=True)
+            self.ids, self.x, self.y_ref, self.ref_tick, self.size, self.speed = (
+                arr[keep] for arr in (self.ids, self.x, self.y_ref, self.ref_tick,
+                                      self.size, self.speed))
+            offset += 4 * count
+
+        # Khối mới (các cột liền nhau)
+        (count,) = _COUNT.unpack_from(payload, offset)
+        offset += _COUNT.size
+        if count:
+            columns = []
+            for dtype in ("<u4", "<i2", "<i2", "<u2", "<u2"):
+                columns.append(np.frombuffer(payload, dtype, count, offset))
+                offset += columns[-1].nbytes
+            ids, x, y, size, speed = columns
+            self.ids = np.concatenate((self.ids, ids))
+            self.x = np.concatenate((self.x, x))
+            self.y_ref = np.concatenate((self.y_ref, y))
+            self.ref_tick = np.concatenate((self.ref_tick, np.full(count, tick, dtype=float)))
+            self.size = np.concatenate((self.size, size))
+            self.speed = np.concatenate((self.speed, speed))
+
+        # Vị trí mọi khối khi đang có event bẻ cong quỹ đạo
+        if flags & FLAG_POSITIONS:
+            n = len(self.ids)
+            self.x = np.frombuffer(payload, "<i2", n, offset).astype(float)
+            self.y_ref = np.frombuffer(payload, "<i2", n, offset + 2 * n).astype(float)
+            self.ref_tick = np.full(n, tick, dtype=float)
+
+    @property
+    def me(self):
+        """(x, bit trạng thái) của người chơi điều khiển client này"""
+        return self.players[self.player_id]
+
+# ===== SERVER =====
+
+class VersusServer:
+    """Server versus: một GameManager nhiều người chơi, phát snapshot mỗi tick
+
+    Ván bắt đầu khi đủ num_players kết nối; người chơi mất kết nối đứng yên
+    tới khi bị loại. max_ticks giới hạn độ dài ván (luật stress không bao giờ
+    kết thúc).
+    """
+    def __init__(self, num_players=2, seed=None, rules=game.ENHANCED_RULES,
+                 host="127.0.0.1", port=DEFAULT_PORT, max_ticks=None):
+        self.num_players = num_players
+        self.rules = rules
+        self.host = host
+        self.port = port
+        self.max_ticks = max_ticks
+        self.game = game.GameManager(seed=seed, rules=rules, num_players=num_players)
+        self.encoder = SnapshotEncoder()
+        self.masks = [0] * num_players
+        self.writers = [None] * num_players
+        self.joined = asyncio.Event()
+        self.server = None
+        # Thống kê
+        self.tick_ms = []
+        self.bytes_sent = 0
+        self.late_ticks = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        hello = await read_message(reader, MAX_CLIENT_MESSAGE)
+        if hello is None or len(hello) != _HELLO.size or _HELLO.unpack(hello) != (NET_MAGIC, NET_VERSION):
+            writer.close()
+            return
+        if None not in self.writers or self.joined.is_set():
+            writer.close()  # đã đủ người
+            return
+        player_id = self.writers.index(None)
+        self.writers[player_id] = writer
+        gm = self.game
+        writer.write(frame(_WELCOME.pack(MSG_WELCOME, player_id, self.num_players, gm.seed,
+                                          game.RULESETS.index(self.rules), game.WIDTH,
+                                          game.HEIGHT, gm.clock.fps)))
+        if None not in self.writers:
+            self.joined.set()
+        while True:
+            message = await read_message(reader, MAX_CLIENT_MESSAGE)
+            if message is None:
+                break
+            # Message sai kích thước hoặc không phải input thì bỏ qua; bit lạ trong mask cũng vậy
+            if len(message) == _INPUT.size and message[0] == MSG_INPUT:
+                self.masks[player_id] = _INPUT.unpack(message)[2] & INPUT_KEYS
+        self.masks[player_id] = 0
+        self.writers[player_id] = None
+
+    def broadcast(self, payload):
+        data = frame(payload)
+        for i, writer in enumerate(self.writers):
+            if writer is None:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                writer.close()
+                self.writers[i] = None
+                continue
+            writer.write(data)
+            self.bytes_sent += len(data)
+
+    async def run(self):
+        """Chờ đủ người rồi chạy ván tới khi kết thúc, trả về GameManager"""
+        if self.server is None:
+            await self.start()
+        await self.joined.wait()
+        gm = self.game
+        loop = asyncio.get_running_loop()
+        interval = 1 / gm.clock.fps
+        deadline = loop.time()
+        perf = time.perf_counter
+        while not gm.game_over and (self.max_ticks is None or gm.clock.tick < self.max_ticks):
+            t0 = perf()
+            gm.update_players([_MASK_KEYS[mask] for mask in self.masks])
+            self.broadcast(self.encoder.encode(gm))
+            self.tick_ms.append((perf() - t0) * 1000)
+            deadline += interval
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # Trễ nhịp: không dồn tick để đuổi kịp
+                self.late_ticks += 1
+                deadline = loop.time()
+                await asyncio.sleep(0)
+        for writer in self.writers:
+            if writer is not None:
+                writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+        return gm
+
+# ===== CLIENT =====
+
+class VersusClient:
+    """Client nhẹ: nhận snapshot, gửi bitmask phím khi nó thay đổi
+
+    policy(world) trả về bitmask INPUT_* cho tick tiếp theo; on_snapshot(world)
+    (nếu có) được gọi sau mỗi snapshot, ví dụ để vẽ.
+    """
+    def __init__(self, policy, host="127.0.0.1", port=DEFAULT_PORT, on_snapshot=None):
+        self.policy = policy
+        self.host = host
+        self.port = port
+        self.on_snapshot = on_snapshot
+        self.world = None
+        self.bytes_received = 0
+        self.snapshots = 0
+
+    async def run(self):
+        """Chơi tới khi ván kết thúc hoặc server đóng kết nối, trả về ClientWorld"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(frame(_HELLO.pack(NET_MAGIC, NET_VERSION)))
+        welcome = await read_message(reader)
+        if welcome is None or welcome[0] != MSG_WELCOME:
+            writer.close()
+            raise ConnectionError("server từ chối kết nối (đã đủ người chơi?)")
+        world = self.world = ClientWorld.from_welcome(welcome)
+        last_mask = 0
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                self.bytes_received += len(message) + _LENGTH.size
+                world.apply(message)
+                self.snapshots += 1
+                if self.on_snapshot is not None and self.on_snapshot(world) is False:
+                    break
+                if world.game_over:
+                    break
+                mask = self.policy(world)
+                if mask != last_mask:
+                    writer.write(frame(_INPUT.pack(MSG_INPUT, world.tick, mask)))
+                    last_mask = mask
+        finally:
+            writer.close()
+        return world
+
+# ===== VẼ PHÍA CLIENT =====
+
+def draw_world(screen, world):
+    """Vẽ thế giới của client bằng sprite cache của game"""
+    screen.fill(world.bg_color)
+    ys = world.block_y().tolist()
+    batch = [(game.sprite_cache.rect(int(size), int(size), game.RED), (x, y))
+             for x, y, size in zip(world.x.tolist(), ys, world.size.tolist())]
+    for x, y, kind in world.powerups:
+        color, symbol = game.POWERUP_STYLES[POWERUP_TYPES[kind]]
+        batch.append((game.sprite_cache.labeled_rect(game.POWERUP_SIZE, color, symbol,
+                                                     game.get_font(game.FONT_SMALL), game.BLACK),
+                      (x, y)))
+    player_y = game.HEIGHT - game.PLAYER_SIZE - 10
+    for i, (x, state) in enumerate(world.players):
+        if not state & PLAYER_ALIVE:
+            continue
+        color = game.ORANGE if state & PLAYER_BOOST else (
+            game.BLUE if i == world.player_id else game.GREEN)
+        alpha = 80 if state & PLAYER_INVISIBLE else 255
+        batch.append((game.sprite_cache.rect(game.PLAYER_SIZE, game.PLAYER_SIZE, color, alpha),
+                      (x, player_y)))
+    screen.blits(batch, doreturn=False)
+    text = game.render_text(game.get_font(game.FONT_MEDIUM), f"Score: {world.score}", game.WHITE)
+    screen.blit(text, (10, 10))
+
+def keyboard_policy(world):
+    keys = pygame.key.get_pressed()
+    return game.input_mask_from_keys(keys)
+
+async def play(host, port):
+    """Client có cửa sổ, điều khiển bằng bàn phím"""
+    screen = None
+
+    def on_snapshot(world):
+        nonlocal screen
+        if screen is None:
+            game.set_arena(*world.arena)
+            screen = game.init_display(scaled=world.arena != game.DEFAULT_ARENA,
+                                       title=game.RULESETS[world.rules].title)
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            return False
+        draw_world(screen, world)
+        pygame.display.flip()
+        return True
+
+    world = await VersusClient(keyboard_policy, host, port, on_snapshot).run()
+    print(f"Hết ván ở tick {world.tick}, điểm {world.score}")
+    pygame.quit()
+
+# ===== SELF-TEST QUA LOCALHOST =====
+
+def wander_policy(player_id):
+    """Bot đơn giản: đổi hướng mỗi nửa giây theo một nhịp riêng cho từng người chơi"""
+    def policy(world):
+        phase = (world.tick // 30 + player_id) % 3
+        return (game.INPUT_LEFT, game.INPUT_RIGHT, 0)[phase]
+    return policy
+
+def compare_worlds(gm, world):
+    """Danh sách lỗi lệch giữa thế giới của server và của một client"""
+    errors = []
+    if world.tick != gm.clock.tick or world.score != gm.score:
+        errors.append(f"tick/score {world.tick}/{world.score} != {gm.clock.tick}/{gm.score}")
+    if not np.array_equal(world.ids, gm.blocks.ids.astype(np.uint32)):
+        errors.append(f"khối {len(world.ids)} != {len(gm.blocks)}")
+    else:
+        dx = np.abs(world.x - gm.blocks.x).max(initial=0)
+        dy = np.abs(world.block_y() - gm.blocks.y).max(initial=0)
+        if dx > 0.5 or dy > 0.5:
+            errors.append(f"lệch vị trí khối dx={dx:.2f} dy={dy:.2f}")
+    for i, player in enumerate(gm.players):
+        if abs(world.players[i][0] - player.x) > 0.5 or bool(world.players[i][1] & PLAYER_ALIVE) != player.alive:
+            errors.append(f"người chơi {i} lệch")
+    return errors
+
+async def selftest(num_players, seconds, seed, rules):
+    server = VersusServer(num_players, seed=seed, rules=rules, port=0,
+                          max_ticks=int(seconds * game.FPS))
+    await server.start()
+    clients = [VersusClient(wander_policy(i), port=server.port) for i in range(num_players)]
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    results = await asyncio.gather(server.run(), *(client.run() for client in clients))
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    gm, worlds = results[0], results[1:]
+
+    ticks = gm.clock.tick
+    tick_ms = sorted(server.tick_ms)
+    print(f"{num_players} client, {ticks} tick trong {wall:.2f} s ({ticks / wall:.1f} Hz), "
+          f"{len(gm.blocks)} khối lúc cuối")
+    print(f"server: tick p50 {tick_ms[len(tick_ms) // 2]:.3f} ms, "
+          f"p99 {tick_ms[int(len(tick_ms) * 0.99)]:.3f} ms, trễ nhịp {server.late_ticks}")
+    print(f"băng thông: {server.bytes_sent / max(1, ticks * num_players):.0f} byte/tick/client")
+    print(f"CPU (server + {num_players} client cùng process): {100 * cpu / wall:.0f}% một core")
+
+    failures = []
+    for i, world in enumerate(worlds):
+        failures += [f"client {i}: {error}" for error in compare_worlds(gm, world)]
+    if ticks / wall < 0.95 * game.FPS:
+        failures.append(f"không giữ được {game.FPS} Hz")
+    for failure in failures:
+        print("FAIL", failure)
+    print("OK" if not failures else f"{len(failures)} lỗi")
+    return 0 if not failures else 1
+
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dodge the Blocks - versus qua mạng")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--serve", action="store_true", help="chạy server")
+    mode.add_argument("--connect", metavar="HOST:PORT", type=parse_address, help="chơi với server")
+    mode.add_argument("--selftest", action="store_true",
+                      help="server + client bot qua localhost, kiểm tra đồng bộ và nhịp tick")
+    parser.add_argument("--players", type=int, default=2, help="số người chơi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rules", choices=sorted(game.RULESETS_BY_NAME), default=None,
+                        help="luật chơi (mặc định enhanced; selftest: stress)")
+    parser.add_argument("--arena", type=game.parse_arena, metavar="WxH")
+    parser.add_argument("--seconds", type=float, default=5, help="độ dài selftest")
+    args = parser.parse_args(argv)
+    if args.arena and max(args.arena) > MAX_NET_ARENA:
+        parser.error(f"--arena: versus qua mạng chỉ hỗ trợ tối đa {MAX_NET_ARENA}x{MAX_NET_ARENA}")
+    if args.arena:
+        game.set_arena(*args.arena)
+
+    if args.connect:
+        asyncio.run(play(*args.connect))
+        return 0
+    if args.selftest:
+        rules = game.RULESETS_BY_NAME[args.rules or "stress"]
+        return asyncio.run(selftest(args.players, args.seconds, args.seed, rules))
+    rules = game.RULESETS_BY_NAME[args.rules or "enhanced"]
+
+    async def serve():
+        server = VersusServer(args.players, seed=args.seed, rules=rules,
+                              host=args.host, port=args.port)
+        await server.start()
+        print(f"Đang chờ {args.players} người chơi ở {args.host}:{server.port} (seed {server.game.seed})")
+        gm = await server.run()
+        print(f"Hết ván ở tick {gm.clock.tick}, điểm {gm.score}")
+    asyncio.run(serve())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# Profiler theo từng phase của frame cho "Dodge the Blocks"
+# Đo thời gian mỗi phase (đọc input, cập nhật player, khối, power-up, vẽ, HUD,
+# flip/tick...), giữ lịch sử cuộn để tính histogram, vẽ overlay dạng đồ thị và
+# ghi từng frame ra CSV để phân tích offline.
+
+import csv
+import time
+from collections import deque
+
+import pygame
+
+# Thứ tự phase trong một frame (cũng là thứ tự cột trong CSV)
+# "update": phần cập nhật ngoài các phase mô phỏng (chuyển màn hình, nhịp tick, pause...)
+PHASES = ("input", "player", "spawn", "blocks", "powerups", "effects", "update",
+          "draw", "ui", "overlay", "present")
+PHASE_COLORS = {
+    "input": (120, 120, 120),
+    "player": (0, 128, 255),
+    "spawn": (128, 0, 255),
+    "blocks": (255, 0, 0),
+    "powerups": (255, 255, 0),
+    "effects": (255, 128, 0),
+    "update": (160, 82, 45),
+    "draw": (0, 255, 0),
+    "ui": (0, 255, 255),
+    "overlay": (255, 0, 128),
+    "present": (255, 255, 255),
+}
+FRAME_BUDGET_MS = 1000 / 60
+HISTOGRAM_EDGES_MS = (1, 2, 4, 8, FRAME_BUDGET_MS, 2 * FRAME_BUDGET_MS)
+
+class NullProfiler:
+    """Profiler không làm gì, dùng mặc định để code game không cần kiểm tra None"""
+    overlay_visible = False
+
+    def begin_frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def toggle_overlay(self):
+        pass
+
+    def close(self):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+class FrameProfiler:
+    """Đo thời gian từng phase bằng các mốc mark() liên tiếp trong một frame
+
+    mark(phase) cộng khoảng thời gian từ mốc trước vào phase đó. Lịch sử của
+    window frame gần nhất được giữ để tính histogram và vẽ overlay.
+    """
+    def __init__(self, window=240, csv_path=None):
+        self.window = window
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.history = {phase: deque(maxlen=window) for phase in PHASES}
+        self.totals = deque(maxlen=window)
+        self.frame = 0
+        self.overlay_visible = False
+        self._last = time.perf_counter()
+        self._csv_file = None
+        self._csv = None
+        if csv_path:
+            self._csv_file = open(csv_path, "w", newline="")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(("frame", "total_ms") + tuple(f"{p}_ms" for p in PHASES))
+
+    def begin_frame(self):
+        for phase in PHASES:
+            self.current[phase] = 0.0
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += (now - self._last) * 1000
+        self._last = now
+
+    def end_frame(self):
+        total = 0.0
+        for phase in PHASES:
+            value = self.current[phase]
+            self.history[phase].append(value)
+            total += value
+        self.totals.append(total)
+        if self._csv is not None:
+            self._csv.writerow([self.frame, f"{total:.4f}"] +
+                               [f"{self.current[p]:.4f}" for p in PHASES])
+            if self.frame % 60 == 0:
+                self._csv_file.flush()
+        self.frame += 1
+
+    def histogram(self, phase=None, edges=HISTOGRAM_EDGES_MS):
+        """Số frame trong mỗi khoảng thời gian (ms) của window hiện tại
+
+        phase=None: dùng tổng thời gian frame. Kết quả có len(edges) + 1 phần tử.
+        """
+        samples = self.totals if phase is None else self.history[phase]
+        counts = [0] * (len(edges) + 1)
+        for value in samples:
+            i = 0
+            while i < len(edges) and value >= edges[i]:
+                i += 1
+            counts[i] += 1
+        return counts
+
+    def mean(self, phase=None):
+        samples = self.totals if phase is None else self.history[phase]
+        return sum(samples) / len(samples) if samples else 0.0
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+    def draw_overlay(self, surface, font):
+        """Vẽ đồ thị cột chồng theo phase cho các frame gần nhất và mức trung bình
+
+        Chữ của overlay đổi mỗi frame nên render thẳng, không qua text cache.
+        """
+        if not self.overlay_visible:
+            return
+        width, height = surface.get_size()
+        graph_h = 100
+        scale = graph_h / (2 * FRAME_BUDGET_MS)  # đỉnh đồ thị = 2 lần ngân sách frame
+        top = height - graph_h - 10
+        left = width - self.window - 10
+        pygame.draw.rect(surface, (0, 0, 0), (left - 5, top - 45, self.window + 10, graph_h + 50))
+
+        histories = [(PHASE_COLORS[p], self.history[p]) for p in PHASES]
+        count = len(self.totals)
+        for i in range(count):
+            x = left + self.window - count + i
+            y = top + graph_h
+            for color, history in histories:
+                h = history[i] * scale
+                if h >= 1:
+                    pygame.draw.line(surface, color, (x, y), (x, max(top, y - h)))
+                y -= h
+                if y <= top:
+                    break
+
+        # Đường ngân sách 16.6 ms
+        budget_y = top + graph_h - FRAME_BUDGET_MS * scale
+        pygame.draw.line(surface, (255, 0, 0), (left, budget_y), (left + self.window, budget_y))
+
+        worst = max(PHASES, key=self.mean)
+        text = f"frame {self.mean():.2f} ms | max {max(self.totals, default=0):.1f} | {worst} {self.mean(worst):.2f}"
+        surface.blit(font.render(text, True, (255, 255, 255)), (left, top - 40))
+        slow = sum(self.histogram()[-2:])
+        surface.blit(font.render(f">{FRAME_BUDGET_MS:.1f} ms: {slow}/{count} frames", True,
+                                 (255, 255, 0)), (left, top - 20))
+
+    def close(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv = None
+
+class StartupTimer:
+    """Đo thời gian từng giai đoạn khởi động (import, mở cửa sổ, font, frame đầu)
+
+    start là mốc time.perf_counter() lúc bắt đầu; mark(phase) ghi khoảng thời
+    gian từ mốc trước tới giờ cho phase đó.
+    """
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self._last = self.start
+        self.phases = []  # (tên phase, ms)
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def total(self):
+        """Tổng thời gian (ms) từ start tới mốc cuối cùng"""
+        return (self._last - self.start) * 1000
+
+    def report(self, budget_ms=None):
+        lines = [f"  {phase:<12}{ms:8.1f} ms" for phase, ms in self.phases]
+        total = f"  {'total':<12}{self.total():8.1f} ms"
+        if budget_ms:
+            status = "OK" if self.total() <= budget_ms else "OVER BUDGET"
+            total += f"  (budget {budget_ms:.0f} ms: {status})"
+        return "\n".join(["Startup:"] + lines + [total])
@@ -0,0 +1,88 @@
+# Ghi và đọc replay của "Dodge the Blocks - Enhanced Edition"
+# Một replay gồm seed của ván game và bitmask phím cho từng frame; vì game chạy
+# theo tick cố định với RNG có seed, phát lại cùng dữ liệu sẽ cho đúng ván đó.
+#
+# Định dạng file (little-endian):
+#   magic "DBRP" | version (u8) | fps (u16) | seed (u64) | số frame (u32)
+#   | luật chơi (u8, từ version 2) | rộng, cao sân chơi (u16, u16, từ version 3)
+#   | bitmask các frame, nén zlib (1 byte mỗi frame)
+#
+# Luật chơi là chỉ số trong RULESETS của game (0 = enhanced, 1 = classic,
+# 2 = stress); file version 1 luôn là enhanced, file trước version 3 luôn có
+# sân chơi 400x600.
+
+import struct
+import zlib
+
+REPLAY_MAGIC = b"DBRP"
+REPLAY_VERSION = 3
+DEFAULT_ARENA = (400, 600)
+_HEADER_V1 = struct.Struct("<4sBHQI")
+_HEADER_V2 = struct.Struct("<4sBHQIB")
+_HEADER = struct.Struct("<4sBHQIBHH")
+
+class Replay:
+    """Một ván game đã ghi: seed, luật chơi, kích thước sân + bitmask input của từng frame"""
+    def __init__(self, seed, fps=60, frames=b"", rules=0, arena=DEFAULT_ARENA):
+        self.seed = seed
+        self.fps = fps
+        self.frames = bytearray(frames)
+        self.rules = rules
+        self.arena = tuple(arena)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def record(self, mask):
+        """Thêm bitmask input của một frame"""
+        self.frames.append(mask)
+
+    def to_bytes(self):
+        header = _HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.fps, self.seed,
+                              len(self.frames), self.rules, *self.arena)
+        return header + zlib.compress(bytes(self.frames), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < _HEADER_V1.size:
+            raise ValueError("file replay quá ngắn")
+        magic, version, fps, seed, count = _HEADER_V1.unpack_from(data)
+        if magic != REPLAY_MAGIC:
+            raise ValueError("không phải file replay của Dodge the Blocks")
+        arena = DEFAULT_ARENA
+        if version == 1:
+            header_size, rules = _HEADER_V1.size, 0
+        elif version == 2:
+            if len(data) < _HEADER_V2.size:
+                raise ValueError("file replay quá ngắn")
+            header_size, rules = _HEADER_V2.size, _HEADER_V2.unpack_from(data)[5]
+        elif version == REPLAY_VERSION:
+            if len(data) < _HEADER.size:
+                raise ValueError("file replay quá ngắn")
+            header_size = _HEADER.size
+            rules, width, height = _HEADER.unpack_from(data)[5:]
+            arena = (width, height)
+        else:
+            raise ValueError(f"không hỗ trợ replay phiên bản {version}")
+        frames = zlib.decompress(data[header_size:])
+        if len(frames) != count:
+            raise ValueError("file replay bị hỏng (sai số frame)")
+        return cls(seed, fps, frames, rules, arena)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+def numbered_path(path, index):
+    """Đường dẫn cho ván thứ index trong cùng phiên: game.dbr, game-2.dbr, game-3.dbr..."""
+    if index <= 1:
+        return path
+    dot = path.rfind(".")
+    if dot <= max(path.rfind("/"), path.rfind("\\")):
+        return f"{path}-{index}"
+    return f"{path[:dot]}-{index}{path[dot:]}"
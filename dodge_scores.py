@@ -0,0 +1,188 @@
+# Lưu điểm của "Dodge the Blocks" an toàn khi crash, không chặn game thread
+# Mỗi ván kết thúc được ghi thêm vào lịch sử (SQLite, bảng runs có index theo
+# điểm) bởi một thread nền; bảng xếp hạng top-N và điểm cao nhất được giữ sẵn
+# trong bộ nhớ nên menu đọc ngay lập tức. File highscore.txt cũ (điểm cao của
+# bản enhanced) vẫn được cập nhật (ghi file tạm rồi os.replace) cho các phiên
+# bản cũ còn đọc nó.
+#
+#   scores = ScoreStore(ruleset="classic")          # mỗi chế độ chơi một bảng xếp hạng
+#   scores.record(score, level, duration_s, seed)   # trả về ngay
+#   scores.high_score, scores.leaderboard
+#   scores.close()                                  # chờ ghi xong khi thoát
+
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+
+DEFAULT_DB = "highscores.db"
+LEGACY_FILE = "highscore.txt"
+LEADERBOARD_SIZE = 10
+LEGACY_RULESET = "enhanced"  # highscore.txt cũ chỉ chứa điểm của bản enhanced
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    duration_s REAL NOT NULL,
+    seed INTEGER,
+    death_cause TEXT,
+    played_at TEXT NOT NULL,
+    ruleset TEXT NOT NULL DEFAULT 'enhanced'
+);
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS runs_by_ruleset_score ON runs (ruleset, score DESC, id)"
+_INSERT = ("INSERT INTO runs (score, level, duration_s, seed, death_cause, played_at, ruleset)"
+           " VALUES (?, ?, ?, ?, ?, ?, ?)")
+_COLUMNS = "score, level, duration_s, seed, death_cause, played_at"
+
+def read_legacy_high_score(path=LEGACY_FILE):
+    """Điểm trong highscore.txt cũ; 0 nếu không có file hoặc file hỏng"""
+    try:
+        with open(path) as f:
+            return max(0, int(f.read().strip() or 0))
+    except (OSError, ValueError):
+        return 0
+
+def atomic_write_text(path, text):
+    """Ghi file tạm cùng thư mục, fsync rồi thay thế: file đích không bao giờ bị ghi dở"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".txt")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class Run:
+    """Một ván đã chơi (một dòng trong bảng runs)"""
+    __slots__ = ("score", "level", "duration_s", "seed", "death_cause", "played_at")
+
+    def __init__(self, score, level, duration_s, seed=None, death_cause=None, played_at=None):
+        self.score = score
+        self.level = level
+        self.duration_s = duration_s
+        self.seed = seed
+        self.death_cause = death_cause
+        self.played_at = played_at or time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def as_row(self):
+        return (self.score, self.level, self.duration_s, self.seed, self.death_cause, self.played_at)
+
+class ScoreStore:
+    """Lịch sử điểm trong SQLite, ghi bằng thread nền, top-N giữ sẵn trong bộ nhớ
+
+    Chỉ __init__ (lúc khởi động) đọc đĩa trên thread gọi; record() chỉ cập nhật
+    bộ nhớ và đưa việc ghi vào hàng đợi, nên gọi ngay lúc người chơi chết
+    không làm khựng frame. Mọi chế độ chơi dùng chung một file, bảng xếp hạng
+    tách theo ruleset.
+    """
+    def __init__(self, path=DEFAULT_DB, legacy_path=LEGACY_FILE, size=LEADERBOARD_SIZE,
+                 ruleset="enhanced"):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.size = size
+        self.ruleset = ruleset
+        self.leaderboard = []  # danh sách Run, điểm giảm dần
+        self.high_score = 0
+        self._queue = queue.Queue()
+        self._load()
+        self._writer = threading.Thread(target=self._write_loop, name="score-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(_SCHEMA)
+        # File tạo trước khi có cột ruleset: mọi ván cũ là bản enhanced
+        columns = [row[1] for row in db.execute("PRAGMA table_info(runs)")]
+        if "ruleset" not in columns:
+            with db:
+                db.execute("ALTER TABLE runs ADD COLUMN ruleset TEXT NOT NULL DEFAULT 'enhanced'")
+        db.execute(_INDEX)
+        return db
+
+    def _load(self):
+        db = self._connect()
+        try:
+            # Lần đầu chạy: chuyển điểm cao từ highscore.txt cũ vào lịch sử
+            if db.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0:
+                legacy = read_legacy_high_score(self.legacy_path) if self.legacy_path else 0
+                if legacy:
+                    with db:
+                        db.execute(_INSERT, Run(legacy, 0, 0.0, None, "legacy").as_row() +
+                                   (LEGACY_RULESET,))
+            rows = db.execute(f"SELECT {_COLUMNS} FROM runs WHERE ruleset = ?"
+                              " ORDER BY score DESC, id LIMIT ?", (self.ruleset, self.size)).fetchall()
+        finally:
+            db.close()
+        self.leaderboard = [Run(*row) for row in rows]
+        self.high_score = self.leaderboard[0].score if self.leaderboard else 0
+
+    def record(self, score, level, duration_s, seed=None, death_cause=None):
+        """Ghi một ván vừa kết thúc; trả về True nếu là điểm cao mới
+
+        Bảng xếp hạng trong bộ nhớ được cập nhật ngay, việc ghi đĩa chạy ở thread nền.
+        """
+        run = Run(score, level, duration_s, seed, death_cause)
+        board = self.leaderboard
+        i = len(board)
+        while i > 0 and board[i - 1].score < score:
+            i -= 1
+        if i < self.size:
+            board.insert(i, run)
+            del board[self.size:]
+        new_high = score > self.high_score
+        if new_high:
+            self.high_score = score
+        self._queue.put((run, new_high))
+        return new_high
+
+    def _write_loop(self):
+        db = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                run, new_high = item
+                try:
+                    with db:
+                        db.execute(_INSERT, run.as_row() + (self.ruleset,))
+                    if new_high and self.legacy_path and self.ruleset == LEGACY_RULESET:
+                        atomic_write_text(self.legacy_path, str(run.score))
+                except (OSError, sqlite3.Error) as e:
+                    # Lỗi đĩa không được làm crash game; điểm vẫn còn trong bộ nhớ
+                    print(f"Không lưu được điểm: {e}")
+                finally:
+                    self._queue.task_done()
+        finally:
+            db.close()
+
+    def flush(self):
+        """Chờ mọi lần ghi đang xếp hàng hoàn tất"""
+        self._queue.join()
+
+    def close(self):
+        """Ghi nốt hàng đợi rồi dừng thread nền"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def history(self, limit=100):
+        """Các ván gần nhất (đọc trực tiếp từ SQLite, dùng cho thống kê ngoài game)"""
+        self.flush()
+        db = sqlite3.connect(self.path)
+        try:
+            rows = db.execute(f"SELECT {_COLUMNS} FROM runs WHERE ruleset = ?"
+                              " ORDER BY id DESC LIMIT ?", (self.ruleset, limit)).fetchall()
+        finally:
+            db.close()
+        return [Run(*row) for row in rows]
@@ -0,0 +1,310 @@
+# Telemetry của "Dodge the Blocks": luồng bản ghi theo phiên, không chặn game thread
+# GameManager phát các bản ghi có kiểu (event bắt đầu/kết thúc, người chơi chết
+# vì gì và lúc đang có event nào, nhặt power-up, lên level, thống kê thời gian
+# frame...) vào một ring buffer cố định; một thread nền gom định kỳ và ghi ra
+# các file JSONL nén gzip, sang file mới khi file hiện tại đủ lớn. Buffer đầy
+# thì bản ghi cũ nhất bị bỏ (và được đếm), game thread không bao giờ phải chờ.
+#
+#   telemetry = Telemetry("telemetry", ruleset="enhanced")
+#   game_manager.telemetry = telemetry
+#   telemetry.frame_time(ms)                   # mỗi frame, gom thành bản tóm tắt
+#   telemetry.close()                          # ghi nốt buffer khi thoát
+#
+#   python dodge_telemetry.py telemetry        # tóm tắt mọi phiên trong thư mục
+#   python dodge_telemetry.py telemetry --json summary.json
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter, deque
+
+DEFAULT_DIR = "telemetry"
+BUFFER_SIZE = 8192            # số bản ghi tối đa chờ ghi
+FLUSH_INTERVAL_S = 1.0
+MAX_FILE_BYTES = 4 * 1024 * 1024  # JSONL chưa nén mỗi file trước khi sang file mới
+FRAME_SUMMARY_FRAMES = 600    # 10 giây ở 60 FPS
+FRAME_BUDGET_MS = 1000 / 60
+
+# Các loại bản ghi (trường "type" trong JSONL)
+REC_SESSION_START = "session_start"
+REC_SESSION_END = "session_end"
+REC_GAME_START = "game_start"
+REC_GAME_END = "game_end"
+REC_EVENT_START = "event_start"
+REC_EVENT_END = "event_end"
+REC_DEATH = "death"
+REC_POWERUP = "powerup"
+REC_LEVEL_UP = "level_up"
+REC_FRAMES = "frames"
+
+class NullTelemetry:
+    """Telemetry không làm gì, dùng mặc định để code game không cần kiểm tra None"""
+    enabled = False
+
+    def emit(self, kind, tick, **fields):
+        pass
+
+    def frame_time(self, ms):
+        pass
+
+    def close(self):
+        pass
+
+NULL_TELEMETRY = NullTelemetry()
+
+class Telemetry:
+    """Ghi các bản ghi của một phiên chơi ra <directory>/<session>-NNN.jsonl.gz
+
+    emit() chỉ thêm một tuple vào deque có maxlen (O(1), không khóa, không
+    I/O); việc chuyển sang JSON, nén và ghi đĩa đều chạy ở thread nền.
+    """
+    enabled = True
+
+    def __init__(self, directory=DEFAULT_DIR, ruleset="enhanced", buffer_size=BUFFER_SIZE,
+                 flush_interval=FLUSH_INTERVAL_S, max_file_bytes=MAX_FILE_BYTES,
+                 frame_summary=FRAME_SUMMARY_FRAMES, **session_fields):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.session = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.max_file_bytes = max_file_bytes
+        self.flush_interval = flush_interval
+        self.frame_summary = frame_summary
+        self.buffer = deque(maxlen=buffer_size)
+        self.emitted = 0
+        self.dropped = 0  # bản ghi bị đẩy ra khi buffer đầy hoặc mất do lỗi ghi đĩa
+        self.written = 0
+        self.files = []
+        self._frames = []
+        self._file = None
+        self._file_bytes = 0
+        self._stop = threading.Event()
+        self.emit(REC_SESSION_START, 0, ruleset=ruleset, **session_fields)
+        self._writer = threading.Thread(target=self._write_loop, name="telemetry-writer",
+                                        daemon=True)
+        self._writer.start()
+
+    def emit(self, kind, tick, **fields):
+        """Thêm một bản ghi (tick: tick mô phỏng lúc xảy ra); trả về ngay"""
+        buffer = self.buffer
+        if len(buffer) == buffer.maxlen:
+            self.dropped += 1
+        buffer.append((kind, tick, time.time(), fields))
+        self.emitted += 1
+
+    def frame_time(self, ms):
+        """Thời gian xử lý một frame; mỗi frame_summary frame phát một bản ghi tóm tắt"""
+        frames = self._frames
+        frames.append(ms)
+        if len(frames) >= self.frame_summary:
+            self._emit_frames()
+
+    def _emit_frames(self):
+        frames = self._frames
+        if not frames:
+            return
+        ordered = sorted(frames)
+        n = len(ordered)
+        self.emit(REC_FRAMES, None, count=n, mean_ms=round(sum(ordered) / n, 3),
+                  p50_ms=round(ordered[n // 2], 3), p95_ms=round(ordered[int(0.95 * (n - 1))], 3),
+                  max_ms=round(ordered[-1], 3),
+                  over_budget=n - bisect_right(ordered, FRAME_BUDGET_MS))
+        frames.clear()
+
+    # ----- thread nền -----
+
+    def _open_next(self):
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.directory, f"{self.session}-{len(self.files):03d}.jsonl.gz")
+        self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+        self._file_bytes = 0
+        self.files.append(path)
+
+    def _drain(self):
+        """Ghi mọi bản ghi đang có trong buffer (chỉ chạy trên thread nền)"""
+        buffer = self.buffer
+        if not buffer:
+            return
+        pending = 0  # bản ghi đã lấy khỏi buffer nhưng chưa chắc đã xuống đĩa
+        try:
+            if self._file is None:
+                self._open_next()
+            while buffer:
+                kind, tick, wall, fields = buffer.popleft()
+                pending += 1
+                line = json.dumps({"type": kind, "session": self.session, "tick": tick,
+                                   "time": round(wall, 3), **fields},
+                                  separators=(",", ":")) + "\n"
+                if self._file_bytes + len(line) > self.max_file_bytes and self._file_bytes:
+                    self._open_next()
+                    # Các dòng trước đã nằm trọn trong file vừa đóng
+                    self.written += pending - 1
+                    pending = 1
+                self._file.write(line)
+                self._file_bytes += len(line)
+            # Đẩy dữ liệu nén xuống đĩa: game crash thì file vẫn đọc được tới đây
+            self._file.flush()
+            self.written += pending
+        except OSError as e:
+            # Lỗi đĩa không được làm crash game: bỏ phần còn lại của lần gom này
+            # (đếm vào dropped) và lần gom sau ghi sang file mới
+            print(f"Không ghi được telemetry: {e}")
+            while buffer:
+                buffer.popleft()
+                pending += 1
+            self.dropped += pending
+            self._abandon_file()
+
+    def _abandon_file(self):
+        """Bỏ file đang ghi dở sau lỗi; handle gzip có thể đã hỏng nên không ghi tiếp vào nó"""
+        file, self._file = self._file, None
+        if file is not None:
+            try:
+                file.close()
+            except OSError:
+                pass
+
+    def _write_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Ghi nốt thống kê frame, bản ghi kết thúc phiên và buffer rồi dừng thread nền"""
+        if not self._writer.is_alive():
+            return
+        self._emit_frames()
+        self.emit(REC_SESSION_END, None, emitted=self.emitted, dropped=self.dropped)
+        self._stop.set()
+        self._writer.join()
+
+# ===== TỔNG HỢP OFFLINE =====
+
+def read_records(path):
+    """Các bản ghi trong một file .jsonl.gz; file bị cắt dở (game crash) thì đọc tới chỗ hỏng"""
+    records = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                records.append(json.loads(line))
+    except (EOFError, OSError, ValueError):
+        pass
+    return records
+
+def iter_records(directory):
+    """Mọi bản ghi trong thư mục, theo thứ tự phiên rồi thứ tự file"""
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".jsonl.gz"):
+            yield from read_records(os.path.join(directory, name))
+
+def distribution(values):
+    ordered = sorted(values)
+    n = len(ordered)
+    if n == 0:
+        return {}
+    return {
+        "mean": statistics.fmean(ordered),
+        "min": ordered[0],
+        "p50": ordered[int(0.5 * (n - 1))],
+        "p90": ordered[int(0.9 * (n - 1))],
+        "max": ordered[-1],
+    }
+
+def summarize(records):
+    """Gộp bản ghi của nhiều phiên thành số liệu tổng hợp (dict, ghi được ra JSON)"""
+    sessions = set()
+    dropped = 0
+    events = Counter()
+    event_duration = {}
+    deaths = Counter()
+    killers = Counter()
+    powerups = Counter()
+    level_ups = Counter()
+    games = []
+    frame_p95 = []
+    frame_max = []
+    over_budget = frames = 0
+    for record in records:
+        kind = record["type"]
+        sessions.add(record["session"])
+        if kind == REC_EVENT_START:
+            events[record["event"]] += 1
+        elif kind == REC_EVENT_END:
+            event_duration.setdefault(record["event"], []).append(record["duration_ticks"])
+        elif kind == REC_DEATH:
+            deaths[record["cause"]] += 1
+            # Tổ hợp event đang active lúc chết, để biết event nào nguy hiểm nhất
+            killers["+".join(record["active_events"]) or "none"] += 1
+        elif kind == REC_POWERUP:
+            powerups[record["powerup"]] += 1
+        elif kind == REC_LEVEL_UP:
+            level_ups[record["level"]] += 1
+        elif kind == REC_GAME_END:
+            games.append(record)
+        elif kind == REC_FRAMES:
+            frames += record["count"]
+            over_budget += record["over_budget"]
+            frame_p95.append(record["p95_ms"])
+            frame_max.append(record["max_ms"])
+        elif kind == REC_SESSION_END:
+            dropped += record["dropped"]
+    return {
+        "sessions": len(sessions),
+        "games": len(games),
+        "dropped_records": dropped,
+        "score": distribution([g["score"] for g in games]),
+        "level": distribution([g["level"] for g in games]),
+        "survival_s": distribution([g["duration_s"] for g in games]),
+        "death_cause": dict(deaths.most_common()),
+        "events_at_death": dict(killers.most_common()),
+        "events_triggered": dict(events.most_common()),
+        "event_duration_ticks": {name: distribution(values)
+                                 for name, values in sorted(event_duration.items())},
+        "powerups": dict(powerups.most_common()),
+        "level_ups": dict(sorted(level_ups.items())),
+        "frames": {
+            "count": frames,
+            "over_budget": over_budget,
+            "p95_ms": distribution(frame_p95),
+            "max_ms": max(frame_max, default=0),
+        },
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tóm tắt telemetry của Dodge the Blocks")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIR,
+                        help="thư mục chứa các file .jsonl.gz")
+    parser.add_argument("--json", metavar="FILE", help="ghi bản tổng hợp đầy đủ ra file JSON")
+    args = parser.parse_args(argv)
+
+    summary = summarize(iter_records(args.directory))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    print(f"{summary['sessions']} phiên, {summary['games']} ván "
+          f"({summary['dropped_records']} bản ghi bị bỏ do buffer đầy)")
+    if summary["games"]:
+        print(f"  score p50={summary['score']['p50']} p90={summary['score']['p90']} "
+              f"max={summary['score']['max']}, survival p50={summary['survival_s']['p50']:.1f}s")
+    print(f"  chết vì: {summary['death_cause']}")
+    for combo, count in list(summary["events_at_death"].items())[:5]:
+        print(f"    {combo:<40}{count:>6}")
+    print(f"  event: {summary['events_triggered']}")
+    print(f"  power-up: {summary['powerups']}")
+    frames = summary["frames"]
+    if frames["count"]:
+        print(f"  frame: {frames['count']} frame, p95 trung vị {frames['p95_ms']['p50']:.2f} ms, "
+              f"max {frames['max_ms']:.2f} ms, {frames['over_budget']} frame vượt "
+              f"{FRAME_BUDGET_MS:.1f} ms")
+
+if __name__ == "__main__":
+    main()